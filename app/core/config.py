@@ -10,5 +10,69 @@ AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_REGION_NAME = os.getenv("AWS_REGION_NAME")
 BUCKET_NAME = os.getenv("BUCKET_NAME")
 
+# Logging: json or text lines written by a background thread; long fields (prompts) are
+# truncated except on a sampled share of records
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_FIELD_MAX_CHARS = int(os.getenv("LOG_FIELD_MAX_CHARS", "500"))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+
+# Client-side provider rate limits, shared by every call path in api_calls
+ANTHROPIC_REQUESTS_PER_MINUTE = int(os.getenv("ANTHROPIC_REQUESTS_PER_MINUTE", "50"))
+ANTHROPIC_TOKENS_PER_MINUTE = int(os.getenv("ANTHROPIC_TOKENS_PER_MINUTE", "40000"))
+STABILITY_REQUESTS_PER_MINUTE = int(os.getenv("STABILITY_REQUESTS_PER_MINUTE", "150"))
+# Threads for blocking provider calls, separate from the default executor used for image work
+PROVIDER_THREADS = int(os.getenv("PROVIDER_THREADS", "32"))
+
+# Local cache of raw Stability base images; S3 holds the durable copy
+BASE_IMAGE_DIR = os.getenv("BASE_IMAGE_DIR", "./base_images")
+BASE_IMAGE_CACHE_MAX_FILES = int(os.getenv("BASE_IMAGE_CACHE_MAX_FILES", "500"))
+
+# Token budget for the bulk topics prompt and the cap applied to each reference post
+TOPICS_PROMPT_TOKEN_BUDGET = int(os.getenv("TOPICS_PROMPT_TOKEN_BUDGET", "2000"))
+TOPICS_POST_MAX_TOKENS = int(os.getenv("TOPICS_POST_MAX_TOKENS", "150"))
+
+# Regenerate-post: most candidate rewrites per request, and the deadline for topping up
+# a short structured answer with single rewrites
+REGENERATE_MAX_CANDIDATES = int(os.getenv("REGENERATE_MAX_CANDIDATES", "4"))
+REGENERATE_DEADLINE_SECONDS = float(os.getenv("REGENERATE_DEADLINE_SECONDS", "30"))
+
+# Idempotency-Key results for generation endpoints, shared by the workers on one host
+IDEMPOTENCY_DIR = os.getenv("IDEMPOTENCY_DIR", "./idempotency")
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "600"))
+
+# Admin endpoints (/admin: loop lag, sampling profiles) are disabled unless a token is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Log the blocking stack when the event loop stalls longer than this (0 disables)
+LOOP_LAG_THRESHOLD_MS = int(os.getenv("LOOP_LAG_THRESHOLD_MS", "250"))
+
+# Anthropic models clients may request and the routing table may use; anything else is rejected
+SUPPORTED_MODELS = [
+    model.strip()
+    for model in os.getenv("SUPPORTED_MODELS", "claude-3-5-haiku-20241022,claude-3-5-sonnet-20241022").split(",")
+    if model.strip()
+]
+# Per-stage model routing: JSON merged over the defaults in model_router, e.g.
+# {"tagline": {"models": ["claude-3-5-haiku-20241022"], "latency_target": 4}}
+MODEL_ROUTES = os.getenv("MODEL_ROUTES", "")
+# Seconds a model that failed (overloaded, timed out) is skipped before it is tried again
+MODEL_FAILURE_COOLDOWN = float(os.getenv("MODEL_FAILURE_COOLDOWN", "60"))
+
+# Speculative image generation: write the image prompt from the purpose/topic and start
+# the Stability call alongside post writing instead of after it (requests may override)
+SPECULATIVE_IMAGE = os.getenv("SPECULATIVE_IMAGE", "false").lower() in ("1", "true", "yes")
+
+# Offer permessage-deflate on websockets (bulk progress messages compress well)
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() in ("1", "true", "yes")
+
+# Largest image (width x height) any endpoint will decode
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", "40000000"))
+
+# Preforked server (serve.py): 0 workers means size from CPU cores and available memory
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0"))
+WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "600"))
+MEMORY_REPORT_INTERVAL = int(os.getenv("MEMORY_REPORT_INTERVAL", "300"))
+
 if not ANTHROPIC_API_KEY or not STABILITY_API_KEY:
     raise ValueError("ANTHROPIC_API_KEY and STABILITY_API_KEY are required.")
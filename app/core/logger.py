@@ -1,4 +1,124 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from app.core.config import LOG_LEVEL, LOG_FORMAT, LOG_FIELD_MAX_CHARS, LOG_PAYLOAD_SAMPLE_RATE
+
+# Set per HTTP request (or bulk job) and stamped on every record logged while it runs,
+# including from tasks and worker threads started by it
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+def get_request_id() -> str:
+    """The current request's id, or a fresh one outside a request."""
+    return request_id_var.get() or str(uuid.uuid4())
+
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+def _truncate(value, limit: int):
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}...(+{len(value) - limit} chars)"
+    if isinstance(value, dict):
+        return {key: _truncate(item, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_truncate(item, limit) for item in value]
+    return value
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line with the message, request id and any `extra` fields.
+    Long string fields (prompts, tracebacks) are cut to LOG_FIELD_MAX_CHARS except
+    on a LOG_PAYLOAD_SAMPLE_RATE share of records, which keep them whole.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        limit = None if random.random() < LOG_PAYLOAD_SAMPLE_RATE else LOG_FIELD_MAX_CHARS
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if limit is not None:
+            entry = _truncate(entry, limit)
+        return json.dumps(entry, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render only the message (and traceback text) on the caller's thread;
+        # the JSON encoding and the write happen on the listener thread
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _output_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(request_id)s:%(message)s"))
+    return handler
+
+class _AsyncLogging:
+    """
+    Root logging goes through an unbounded queue to a listener thread that formats
+    and writes, so a log call from the event loop costs an enqueue, not a write.
+    """
+
+    def __init__(self):
+        self.output = _output_handler()
+        self.handler = _QueueHandler(queue.SimpleQueue())
+        self.handler.addFilter(RequestIdFilter())
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.output)
+
+    def install(self):
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(self.handler)
+        self.listener.start()
+        atexit.register(self.stop)
+        # Forked workers (serve.py) do not inherit the listener thread; give each its own
+        os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _restart_in_child(self):
+        self.handler.queue = queue.SimpleQueue()
+        self.listener = logging.handlers.QueueListener(self.handler.queue, self.output)
+        self.listener.start()
+
+    def stop(self):
+        # Flushes whatever is still queued before the process exits
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+_async_logging = _AsyncLogging()
+_async_logging.install()
+
+def flush_logs():
+    """Write out queued records; call before leaving a process through os._exit."""
+    _async_logging.stop()
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
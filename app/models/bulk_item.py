@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, root_validator, validator
 from typing_extensions import Annotated
 from typing import Optional, Dict
+from app.utils.validate_model import validate_model
 
 class BulkItem(BaseModel):
     length: Annotated[int, Field(strict=True, ge=10, le=700)] = 150
@@ -32,4 +33,8 @@ class BulkItem(BaseModel):
     def validate_preferredTone(cls, value):
         if not value or value.strip() == "":
             raise ValueError("Preferred Tone parameter cannot be empty.")
-        return value.strip()
\ No newline at end of file
+        return value.strip()
+
+    @validator("model")
+    def validate_supported_model(cls, value):
+        return validate_model(value)
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+class BulkOptions(BaseModel):
+    # bool parsing accepts true/false and their usual string forms ("false", "no", "0", ...)
+    # and rejects anything else, instead of treating every non-empty string as True
+    speculative_image: bool
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, root_validator, validator
 from typing_extensions import Annotated
 from typing import Optional, Dict
+from app.utils.validate_model import validate_model
 
 class Item(BaseModel):
     length: Annotated[int, Field(strict=True, ge=10, le=700)] = 150
@@ -24,4 +25,8 @@ class Item(BaseModel):
             raise ValueError("Style parameter cannot be empty.")
         if len(value) > 300:
             raise ValueError("Custom style description cannot exceed 300 characters.")
-        return value.strip()
\ No newline at end of file
+        return value.strip()
+
+    @validator("model")
+    def validate_supported_model(cls, value):
+        return validate_model(value)
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field, validator
+from typing_extensions import Annotated, Optional
+from app.utils.constants import OUTPUT_FORMATS
+
+class OutputEncoding(BaseModel):
+    output_format: str = "jpeg"
+    quality: Annotated[int, Field(ge=1, le=100)] = 85
+    target_bytes: Optional[Annotated[int, Field(ge=1024)]] = None
+
+    @validator("output_format")
+    def validate_output_format(cls, value):
+        value = (value or "jpeg").strip().lower()
+        if value == "jpg":
+            value = "jpeg"
+        if value not in OUTPUT_FORMATS:
+            raise ValueError(f"Output format must be one of: {', '.join(OUTPUT_FORMATS)}")
+        return value
+
+    @property
+    def content_type(self) -> str:
+        return OUTPUT_FORMATS[self.output_format]["content_type"]
+
+    @property
+    def extension(self) -> str:
+        return OUTPUT_FORMATS[self.output_format]["extension"]
\ No newline at end of file
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, root_validator
+from pydantic import BaseModel, Field, root_validator, validator
 from typing_extensions import Annotated
+from app.utils.validate_model import validate_model
 
 class RegenerationImage(BaseModel):
     purpose: str
@@ -10,3 +11,6 @@ class RegenerationImage(BaseModel):
     style: str
     model: Annotated[str, Field(min_length=3, max_length=50)] = "claude-3-5-haiku-20241022"
 
+    @validator("model")
+    def validate_supported_model(cls, value):
+        return validate_model(value)
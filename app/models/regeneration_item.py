@@ -1,7 +1,12 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 from typing_extensions import Annotated, Optional
+from app.utils.validate_model import validate_model
 
 class RegenerationItem(BaseModel):
     post: str
     suggestion: Optional[str] = None
     model: Annotated[str, Field(min_length=3, max_length=50)] = "claude-3-5-haiku-20241022"
+
+    @validator("model")
+    def validate_supported_model(cls, value):
+        return validate_model(value)
@@ -0,0 +1,66 @@
+import asyncio
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+from typing_extensions import Optional
+from app.core.config import ADMIN_TOKEN
+from app.core.logger import logger
+from app.services.loop_monitor import loop_watchdog
+from app.services.model_router import model_router
+from app.services.profiler import profiler, ProfilerBusy, DEFAULT_HZ, MAX_SECONDS
+
+router = APIRouter()
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Admin endpoints do not exist unless ADMIN_TOKEN is set, and need it in X-Admin-Token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+@router.get("/loop-lag", dependencies=[Depends(require_admin)])
+async def loop_lag():
+    """Event-loop lag statistics and the stacks captured for recent stalls."""
+    return loop_watchdog.stats()
+
+@router.get("/models", dependencies=[Depends(require_admin)])
+async def models():
+    """Routing table and the observed latency, cost and failures per stage and model."""
+    return {"routes": model_router.routes, "observed": model_router.report()}
+
+@router.post("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10, gt=0, le=MAX_SECONDS),
+    hz: int = Query(DEFAULT_HZ, ge=1, le=1000)
+):
+    """Sample every thread of this worker for `seconds` and return collapsed stacks for a flamegraph."""
+    try:
+        return await asyncio.to_thread(profiler.profile_for, seconds, hz)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def stored_profile(profile_id: str):
+    """Profile recorded for a request sent with X-Profile: 1 (its id is in the X-Profile-Id response header)."""
+    if profile_id not in profiler.profiles:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profiler.profiles[profile_id]
+
+async def profile_marked_requests(request: Request, call_next):
+    """HTTP middleware: profile a request while it runs when an admin marks it with X-Profile: 1."""
+    if request.headers.get("X-Profile") != "1" or not is_admin(request.headers.get("X-Admin-Token")):
+        return await call_next(request)
+    try:
+        session = profiler.start()
+    except ProfilerBusy:
+        logger.warning("Profiler busy, serving marked request unprofiled")
+        return await call_next(request)
+    try:
+        response = await call_next(request)
+    finally:
+        profile_id = profiler.store(await asyncio.to_thread(session.stop))
+    response.headers["X-Profile-Id"] = profile_id
+    return response
@@ -1,19 +1,30 @@
 from fastapi import APIRouter, HTTPException, Form, WebSocket, Depends, WebSocketDisconnect
 from app.models.bulk_item import BulkItem
-import io
+from app.models.output_encoding import OutputEncoding
+from app.models.bulk_options import BulkOptions
 from PIL import Image
+from app.services.image_decoding import decode_image, ANALYSIS_MAX_SIDE
 from app.services.image_processing import extract_color_proportions
-from app.services.prompt_building import build_prompt_bulk_generation, build_prompt_tagline_no_purpose, build_topics_gen_prompt, build_prompt_font_selection
-from app.services.api_calls import fetch_response, fetch_image_response
+from app.services.prompt_building import build_prompt_bulk_generation, build_prompt_tagline_no_purpose, assemble_topics_prompt, build_topic_replacement_prompt, build_prompt_font_selection
+from app.services.api_calls import fetch_response, astream_response
+from app.services.model_router import model_router
+from app.services.rate_limiter import PRIORITY_BULK
 from app.services.image_processing import overlay_logo, add_text_overlay
-from app.services.text_processing import get_post_facebook, get_posts_linkedIn, get_text_business
+from app.services.post_ranking import rank_facebook_posts
+from app.services.topic_dedup import TopicDeduplicator
+from app.services.text_processing import get_post_facebook, get_posts_linkedIn, get_text_business, TopicStreamParser
 from app.utils.download_image_from_url import download_image_from_url
-from app.core.logger import logger
+from app.core.config import SPECULATIVE_IMAGE
+from app.core.logger import logger, request_id_var
 import uuid
 from app.services.prompt_building import build_dynamic_image_prompt
 from app.services.s3 import upload_image_to_s3, BUCKET_NAME
+from app.services.post_generation import generate_base_image, start_speculative_image, discard_speculative_image
+from app.services.renditions import parse_renditions, render_renditions, upload_renditions
 import json
 import asyncio
+import traceback
+from pydantic import ValidationError
 from app.sockets.websocket_manager import manager
 from typing import Dict, List
 from app.utils.constants import FONT_LIST
@@ -28,53 +39,79 @@ async def process_single_post(
     output_image: Image.Image,
     color_proportions: List[dict],
     model: str,
-    business_text: dict
+    business_text: dict,
+    encoding: OutputEncoding,
+    rendition_names: List[str],
+    speculative: bool = False
 ) -> dict:
     """Process a single post generation with all required steps."""
+    image_task = None
     try:
         colors = ", ".join([sub['colorCode'] for sub in color_proportions])
         item.purpose = topic
+
+        # Speculative mode starts the base image from the topic while the post is written
+        if speculative:
+            image_task = start_speculative_image(topic, item.style, colors, business_text, PRIORITY_BULK)
         
         # Generate post content
         prompt = build_prompt_bulk_generation(item, business_text)
-        post_res = fetch_response(prompt, item.model)
+        post_res = await model_router.fetch_text("post", prompt, item.model, PRIORITY_BULK)
         
         # Generate tagline
         tagline_prompt = build_prompt_tagline_no_purpose(item, post_res.content[0].text)
-        tagline = fetch_response(tagline_prompt, "claude-3-5-sonnet-20241022").content[0].text
+        tagline = (await model_router.fetch_text(
+            "tagline", tagline_prompt, None, PRIORITY_BULK
+        )).content[0].text
         
         # Generate and process image
-        image_prompt_dynamic = build_dynamic_image_prompt(post_res.content[0].text, item.style, colors)
-        image_prompt = fetch_response(image_prompt_dynamic, "claude-3-5-sonnet-20241022").content[0].text
-        image = fetch_image_response(image_prompt, "ultra")
+        if image_task is None:
+            image_prompt_dynamic = build_dynamic_image_prompt(post_res.content[0].text, item.style, colors)
+            image, base_image = await generate_base_image(image_prompt_dynamic, PRIORITY_BULK)
 
         font_prompt = build_prompt_font_selection(item, tagline, FONT_LIST)
 
-        logger.info(f"Generated font prompt: {font_prompt}")
+        logger.debug("Selecting font", extra={"prompt": font_prompt})
+
+        model_font = await model_router.fetch_text("font", font_prompt, item.model, PRIORITY_BULK)
 
-        model_font = fetch_response(font_prompt, item.model)
+        if image_task is not None:
+            image, base_image = await image_task
 
         font = get_valid_font(model_font.content[0].text, FONT_LIST)
 
-        logger.info(f"Generated font: {font}")
+        logger.info("Selected font", extra={"font": font})
         
         # Process image with overlays
-        final_image_bytes = add_text_overlay(image, tagline, "test", font, logo_bytes)
+        final_image_bytes = await asyncio.to_thread(
+            add_text_overlay, image, tagline, "test", font, logo_bytes, encoding, base_image["backdrop_color"]
+        )
         # final_image_bytes = overlay_logo(text_image, logo_bytes)
         
         # Upload to S3
-        image_name = f"gen_post_{uuid.uuid4().hex}.jpeg"
-        await upload_image_to_s3(final_image_bytes, image_name)
+        image_id = uuid.uuid4().hex
+        image_name = f"gen_post_{image_id}.{encoding.extension}"
+        await upload_image_to_s3(final_image_bytes, image_name, encoding.content_type)
         s3_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{image_name}"
         
-        return {
+        post_data = {
             "topic": topic,
             "post": post_res.content[0].text,
             "tagline": tagline,
             "image_url": s3_url,
+            "base_image_id": base_image["id"],
         }
-    except Exception as e:
-        logger.error(f"Error processing post for topic '{topic}': {str(e)}")
+        if rendition_names:
+            rendered = await render_renditions(
+                image, rendition_names, tagline, "test", font, logo_bytes,
+                encoding, base_image["backdrop_color"]
+            )
+            post_data["renditions"] = await upload_renditions(rendered, image_id, encoding)
+        return post_data
+    except BaseException as e:
+        await discard_speculative_image(image_task)
+        if isinstance(e, Exception):
+            logger.error(f"Error processing post for topic '{topic}': {str(e)}")
         raise
 
 @router.websocket("/ws/bulk-generate/{client_id}")
@@ -82,15 +119,13 @@ async def bulk_post_generation(websocket: WebSocket, client_id: str):
     await manager.connect(websocket, client_id)
     try:
         while True:
-            raw_data = await websocket.receive_text()
             try:
-                data = json.loads(raw_data) if isinstance(raw_data, str) else json.loads(json.dumps(raw_data))
-            except json.JSONDecodeError as e:
-                await websocket.send_text(json.dumps({
-                    "type": "error",
-                    "message": f"Invalid JSON format: {str(e)}"
-                }))
+                data = await manager.receive(client_id)
+            except ValueError as e:
+                await manager.send_error(client_id, str(e))
                 continue
+            # Each bulk job gets its own id on every log record it produces
+            request_id_var.set(str(uuid.uuid4()))
 
             # Extract business description
             business_description = data.get("businessDescription", {})
@@ -109,6 +144,16 @@ async def bulk_post_generation(websocket: WebSocket, client_id: str):
                     style=data.get("style", "digital"),
                     model=data.get("model", "claude-3-5-haiku-20241022")
                 )
+                encoding = OutputEncoding(
+                    output_format=data.get("output_format", "jpeg"),
+                    quality=data.get("quality", 85),
+                    target_bytes=data.get("target_bytes")
+                )
+                rendition_names = parse_renditions(data.get("renditions"))
+                options = BulkOptions(speculative_image=data.get("speculative_image", SPECULATIVE_IMAGE))
+                speculative = options.speculative_image
+                # "refs": the complete message lists delivered posts instead of repeating them
+                complete_by_reference = data.get("complete_posts", "full") == "refs"
             except ValidationError as e:
                 error_messages = []
                 for error in e.errors():
@@ -132,66 +177,117 @@ async def bulk_post_generation(websocket: WebSocket, client_id: str):
             # Process posts data
             posts_text = []
             if facebook_posts.get("payload"):
-                posts_facebook = get_post_facebook(facebook_posts["payload"], number_of_posts)
+                # Prefer the best-performing posts when the payload carries per-post metrics
+                posts_facebook = (
+                    rank_facebook_posts(facebook_posts["payload"], number_of_posts)
+                    or get_post_facebook(facebook_posts["payload"], number_of_posts)
+                )
                 posts_text = posts_facebook
             if linkedin_posts.get("payload"):
                 posts_linkedin = get_posts_linkedIn(linkedin_posts["payload"], number_of_posts)
                 if len(posts_linkedin) > len(posts_text):
                     posts_text = posts_linkedin
 
-            # Generate topics
-            try:
-                prompt = build_topics_gen_prompt(posts_text, business_text, number_of_posts)
-                topics_res = fetch_response(prompt, item.model)
-                topics_data = topics_res.content[0].text
-                if isinstance(topics_data, str):
-                    topics = json.loads(topics_data)["topics"]
-                else:
-                    topics = topics_data["topics"]            
-                
-            except Exception as e:
-                await manager.send_error(client_id, f"Error generating topics: {str(e)}")
-                continue
-
-            # Process logo
+            # Process logo (needed before the first post can start)
             try:
                 logo_bytes = await download_image_from_url(data["logo"])
-                output_image = Image.open(io.BytesIO(logo_bytes)).convert("RGBA")
-                color_proportions = extract_color_proportions(output_image)
+                output_image = await asyncio.to_thread(decode_image, logo_bytes, ANALYSIS_MAX_SIDE)
+                color_proportions = await asyncio.to_thread(extract_color_proportions, output_image)
             except Exception as e:
                 await manager.send_error(client_id, f"Error processing logo: {str(e)}")
                 continue
 
-            # Process posts with progress updates
-            posts = []
-            for idx, topic in enumerate(topics, 1):
+            # Stream topics; each one is handed to the post pipeline as soon as
+            # its string closes, while later topics are still being generated
+            topic_queue = asyncio.Queue()
+            topics_prompt, prompt_report = assemble_topics_prompt(posts_text, business_text, number_of_posts)
+            logger.info("Assembled topics prompt", extra={"client_id": client_id, **prompt_report})
+
+            # Near-duplicate topics are held back before any post work is spent on them
+            deduplicator = TopicDeduplicator(
+                f"{item.bzname} {business_text['category']} {business_text['description']}"
+            )
+
+            async def accept_topics(topics):
+                for topic in topics:
+                    if len(deduplicator.accepted) >= number_of_posts:
+                        return
+                    if deduplicator.add(topic):
+                        await topic_queue.put(topic)
+
+            async def stream_topics():
+                parser = TopicStreamParser()
                 try:
-                    post_data = await process_single_post(
-                        topic, item, logo_bytes, output_image, 
-                        color_proportions, item.model, business_text
-                    )
-                    posts.append(post_data)
-                    progress_message = {
-                            "type": "progress",
-                            "current": idx,
-                            "total": number_of_posts,
-                            "post_data": post_data
-                        }
-                    await websocket.send_text(json.dumps(progress_message))
+                    async for chunk in astream_response(topics_prompt, item.model, PRIORITY_BULK):
+                        await accept_topics(parser.feed(chunk))
+                    await accept_topics(parser.finish())
 
-                except Exception as e:
-                    await manager.send_error(client_id, f"Error processing post {idx}: {str(e)}")
-                    logger.error(f"Error processing post {idx}: {str(e)}")
-                    continue
+                    missing = min(len(deduplicator.duplicates), number_of_posts - len(deduplicator.accepted))
+                    if missing > 0:
+                        logger.info(f"Replacing {missing} near-duplicate topics", extra={
+                            "client_id": client_id,
+                            "duplicates": deduplicator.duplicates
+                        })
+                        try:
+                            prompt = build_topic_replacement_prompt(business_text, deduplicator.accepted, missing)
+                            response = await fetch_response(prompt, item.model, PRIORITY_BULK)
+                            replacement_parser = TopicStreamParser()
+                            replacements = replacement_parser.feed(response.content[0].text)
+                            await accept_topics(replacements + replacement_parser.finish())
+                        except Exception as e:
+                            logger.error(f"Error generating replacement topics: {str(e)}")
+                finally:
+                    await topic_queue.put(None)
+
+            topics_task = asyncio.create_task(stream_topics())
+
+            # Process posts with progress updates; the topic stream must not outlive the
+            # job if it ends early (disconnect, send failure), or it keeps using quota
+            try:
+                posts = []
+                delivered = []
+                idx = 0
+                while True:
+                    topic = await topic_queue.get()
+                    if topic is None:
+                        break
+                    if idx >= number_of_posts:
+                        continue
+                    idx += 1
+                    try:
+                        post_data = await process_single_post(
+                            topic, item, logo_bytes, output_image, 
+                            color_proportions, item.model, business_text, encoding,
+                            rendition_names, speculative
+                        )
+                        posts.append(post_data)
+                        await manager.send_progress(client_id, idx, number_of_posts, post_data)
+                        delivered.append(idx)
 
-                await asyncio.sleep(0.1)
+                    except Exception as e:
+                        await manager.send_error(client_id, f"Error processing post {idx}: {str(e)}")
+                        logger.error(f"Error processing post {idx}: {str(e)}")
+                        continue
+
+                    await asyncio.sleep(0.1)
+
+                try:
+                    await topics_task
+                    if idx == 0:
+                        raise ValueError("No topics were returned")
+                except Exception as e:
+                    await manager.send_error(client_id, f"Error generating topics: {str(e)}")
+                    if idx == 0:
+                        continue
+            finally:
+                if not topics_task.done():
+                    topics_task.cancel()
 
             # Send completion message
-            completion_message = {
-                    "type": "complete",
-                    "posts": posts
-                }
-            await websocket.send_text(json.dumps(completion_message))
+            await manager.send_complete(
+                client_id, posts, delivered, complete_by_reference,
+                prompt_tokens_saved=prompt_report["tokens_saved"]
+            )
 
     except WebSocketDisconnect:
         manager.disconnect(client_id)
@@ -1,21 +1,12 @@
-from fastapi import APIRouter, HTTPException, Form
-import io
-from PIL import Image
-from app.services.image_processing import extract_color_proportions
+from fastapi import APIRouter, HTTPException, Form, Header
 from app.models.item import Item
-from app.services.prompt_building import build_prompt_generation, build_prompt_tagline
-from app.services.api_calls import fetch_response, fetch_image_response
-from app.services.image_processing import overlay_logo, add_text_overlay, generate_random_hex_color
-from app.services.s3 import upload_image_to_s3, BUCKET_NAME
+from app.models.output_encoding import OutputEncoding
+from app.services.idempotency import idempotency_store, request_fingerprint, IdempotencyConflict
+from app.services.post_generation import generate_single_post
+from app.services.renditions import parse_renditions
 from app.services.text_processing import get_text_business
-from typing_extensions import Annotated
-from app.utils.download_image_from_url import download_image_from_url
+from typing_extensions import Annotated, Optional
 from app.core.logger import logger
-import uuid
-from app.services.prompt_building import build_dynamic_image_prompt
-from app.utils.constants import FONT_LIST
-from app.services.prompt_building import build_prompt_font_selection
-from app.utils.validate_font import get_valid_font
 import traceback
 import json
 
@@ -32,7 +23,13 @@ async def generate_post(
     style: str= Form(...),
     businessDescription: str = Form(...),
     logo: str = Form(...),
-    model: Annotated[str, Form(..., min_length=3, max_length=50)] = "claude-3-5-haiku-20241022"
+    model: Annotated[str, Form(..., min_length=3, max_length=50)] = "claude-3-5-haiku-20241022",
+    output_format: str = Form("jpeg"),
+    quality: int = Form(85),
+    target_bytes: Optional[int] = Form(None),
+    renditions: str = Form(""),
+    speculative_image: Optional[bool] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     try:
         item = Item(
@@ -50,65 +47,29 @@ async def generate_post(
             raise HTTPException(status_code=400, detail=item.error)
 
         try:
-            logo_bytes = await download_image_from_url(logo)
-            output_image = Image.open(io.BytesIO(logo_bytes)).convert("RGBA")
-
-            color_proportions = extract_color_proportions(output_image)
-            colors = ", ".join([ sub['colorCode'] for sub in color_proportions ])
+            encoding = OutputEncoding(output_format=output_format, quality=quality, target_bytes=target_bytes)
+            rendition_names = parse_renditions(renditions)
 
             businessText = get_text_business(json.loads(businessDescription))
 
-            prompt = build_prompt_generation(item, businessText)
-            logger.info(f"Generating post with prompt: {prompt}")
-
-            post = fetch_response(prompt, item.model)
-
-            tagline_prompt = build_prompt_tagline(item, post.content[0].text)
-            logger.info(f"Generating tagline with prompt: {tagline_prompt}")
-            
-            tagline = fetch_response(tagline_prompt, "claude-3-5-sonnet-20241022").content[0].text
-            logger.info(f"Generated tagline: {tagline}")
-            
-            image_model = "ultra"
-            image_prompt_dynamic = build_dynamic_image_prompt(post.content[0].text, item.style, colors)
-
-            image_prompt = fetch_response(image_prompt_dynamic, "claude-3-5-sonnet-20241022").content[0].text
-
-            logger.info(f"Generated image prompt: {image_prompt}")
-
-            image = fetch_image_response(image_prompt, image_model)
-
-            if not item.style or item.style == "vibrant color theme" or "#" not in item.style:
-                image_style = generate_random_hex_color()
-            else:
-                image_style = item.style.split(",")[0].strip()
-            
-            font_prompt = build_prompt_font_selection(item, tagline, FONT_LIST)
-
-            logger.info(f"Generated font prompt: {font_prompt}")
-
-            model_font = fetch_response(font_prompt, item.model)
-
-            font = get_valid_font(model_font.content[0].text, FONT_LIST)
-
-            logger.info(f"Generated font: {font}")
-
-            final_image_bytes = add_text_overlay(image, tagline, image_style, font, logo_bytes)
-
-            # final_image_bytes = overlay_logo(text_image, logo_bytes)
-
-            image_name = f"gen_post_{uuid.uuid4().hex}.jpeg"
-            await upload_image_to_s3(final_image_bytes, image_name) 
-            s3_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{image_name}"
-
-            return {
-                "post": post.content[0].text, 
-                "tagline": tagline,
-                "image_url": s3_url,  # Return the S3 URL instead of Base64
-                "input_tokens": post.usage.input_tokens,
-                "output_tokens": post.usage.output_tokens,    
-            }
+            if not idempotency_key:
+                return await generate_single_post(
+                    item, businessText, logo, encoding, rendition_names, speculative_image
+                )
+
+            # A client retrying after a timeout gets the first attempt's post instead of a new one
+            fingerprint = request_fingerprint({
+                "item": item.dict(), "business": businessText, "logo": logo,
+                "encoding": encoding.dict(), "renditions": rendition_names,
+                "speculative_image": speculative_image,
+            })
+            return await idempotency_store.run(
+                "generate-post", idempotency_key, fingerprint,
+                lambda: generate_single_post(item, businessText, logo, encoding, rendition_names, speculative_image)
+            )
         
+        except IdempotencyConflict as conflict:
+            raise HTTPException(status_code=422, detail=str(conflict))
         except HTTPException as http_exc:
             logger.warning(f"HTTP exception: {http_exc.detail}")
             raise HTTPException(status_code=400, detail="HTTP exception")
@@ -3,13 +3,13 @@ from fastapi.responses import JSONResponse
 from typing import Dict, Any
 from urllib.parse import urlparse
 import traceback
+import asyncio
 import io
 from PIL import Image
-import uuid
 
 from app.services.image_processing import remove_background, extract_color_proportions
 from app.utils.download_image_from_url import download_image_from_url
-from app.core.logger import logger
+from app.core.logger import logger, get_request_id
 
 router = APIRouter()
 
@@ -41,7 +41,7 @@ async def process_image(file: str = Form(...)) -> JSONResponse:
     Raises:
         HTTPException: Various exceptions based on the error type
     """
-    request_id = str(uuid.uuid4())
+    request_id = get_request_id()
     
     logger.info(f"Starting image processing request", extra={
         "request_id": request_id,
@@ -58,10 +58,10 @@ async def process_image(file: str = Form(...)) -> JSONResponse:
         
         logger.debug("Removing background", extra={"request_id": request_id})
         #output_image = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
-        image_no_bg = remove_background(image_bytes)
+        image_no_bg = await asyncio.to_thread(remove_background, image_bytes)
         
         logger.debug("Extracting color proportions", extra={"request_id": request_id})
-        color_proportions = extract_color_proportions(image_no_bg)
+        color_proportions = await asyncio.to_thread(extract_color_proportions, image_no_bg)
         
         logger.info("Successfully processed image", extra={
             "request_id": request_id,
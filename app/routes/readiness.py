@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.warmup import warmup
+
+router = APIRouter()
+
+@router.get("/ready")
+async def ready():
+    """503 until every warm-up component has loaded, so the proxy only routes to warm workers."""
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.report())
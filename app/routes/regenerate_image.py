@@ -1,22 +1,26 @@
-from fastapi import APIRouter, HTTPException, Form, status
+from fastapi import APIRouter, HTTPException, Form, Header, status
 from typing_extensions import Annotated, Optional
 from typing import Dict, Any
 import uuid
 import traceback
-import io
-from PIL import Image
+import asyncio
+from app.services.image_decoding import decode_image, ANALYSIS_MAX_SIDE
 from app.services.image_processing import extract_color_proportions
 from app.services.prompt_building import build_prompt_tagline_no_purpose, build_dynamic_image_prompt_purpose
-from app.services.api_calls import fetch_response, fetch_image_response
+from app.services.model_router import model_router
 from app.services.image_processing import (
     overlay_logo, 
     add_text_overlay, 
     generate_random_hex_color
 )
 from app.utils.download_image_from_url import download_image_from_url
-from app.core.logger import logger
+from app.core.logger import logger, get_request_id
 from app.models.regenerate_image import RegenerationImage
+from app.models.output_encoding import OutputEncoding
 from app.services.s3 import upload_image_to_s3, BUCKET_NAME
+from app.services.base_image_store import base_image_store
+from app.services.idempotency import idempotency_store, request_fingerprint, IdempotencyConflict
+from app.services.renditions import parse_renditions, render_renditions, upload_renditions
 from app.utils.constants import FONT_LIST
 from app.services.prompt_building import build_prompt_font_selection
 from app.utils.validate_font import get_valid_font
@@ -54,7 +58,104 @@ def validate_inputs(
     if count >= 2:
         raise ValueError("Cannot regenerate more than 2 times")
 
-@router.post("/regenerate-image", response_model=Dict[str, str])
+async def build_regenerated_image(
+    item: RegenerationImage,
+    post: str,
+    logo: str,
+    encoding: OutputEncoding,
+    rendition_names,
+    request_id: str
+) -> Dict[str, Any]:
+    """Run the tagline, image prompt, base image, overlay and upload steps for one request."""
+    # Generate tagline
+    logger.debug("Generating tagline", extra={"request_id": request_id})
+    tagline_prompt = build_prompt_tagline_no_purpose(item, post)
+    tagline_response = await model_router.fetch_text("tagline", tagline_prompt)
+    if not tagline_response or not tagline_response.content:
+        raise ValueError("Failed to generate tagline")
+    tagline = tagline_response.content[0].text
+
+    logo_bytes = await download_image_from_url(logo)
+    output_image = await asyncio.to_thread(decode_image, logo_bytes, ANALYSIS_MAX_SIDE)
+
+    color_proportions = await asyncio.to_thread(extract_color_proportions, output_image)
+    colors = ", ".join([ sub['colorCode'] for sub in color_proportions ])
+    
+    # Generate image prompt
+    logger.debug("Generating image prompt", extra={"request_id": request_id})
+    image_prompt_dynamic = build_dynamic_image_prompt_purpose(post, item.style, item.purpose, colors)
+    image_prompt_response = await model_router.fetch_text("image_prompt", image_prompt_dynamic)
+    if not image_prompt_response or not image_prompt_response.content:
+        raise ValueError("Failed to generate image prompt")
+    image_prompt = image_prompt_response.content[0].text
+    
+    # Generate and process image
+    logger.debug("Generating base image", extra={"request_id": request_id})
+    image, image_model = await model_router.fetch_image(image_prompt)
+    base_image = await base_image_store.put(image, image_prompt, image_model)
+    
+    # Determine color theme
+    if not item.style or item.style == "digital" or "#" not in item.style:
+        image_style = generate_random_hex_color()
+    else:
+        image_style = item.style.split(",")[0].strip()
+    
+    # Add overlays
+    logger.debug("Adding text overlay", extra={"request_id": request_id})
+    font_prompt = build_prompt_font_selection(item, tagline, FONT_LIST)
+
+    logger.debug("Selecting font", extra={"prompt": font_prompt})
+
+    model_font = await model_router.fetch_text("font", font_prompt, item.model)
+
+    font = get_valid_font(model_font.content[0].text, FONT_LIST)
+
+    logger.info("Selected font", extra={"font": font})
+
+    final_image_bytes = await asyncio.to_thread(
+        add_text_overlay, image, tagline, image_style, font, logo_bytes, encoding, base_image["backdrop_color"]
+    )
+    
+    logger.debug("Downloading and adding logo", extra={"request_id": request_id})
+    # final_image_bytes = overlay_logo(text_image, logo_bytes)
+    
+    # Upload to S3
+    image_id = uuid.uuid4().hex
+    image_name = f"gen_post_{image_id}.{encoding.extension}"
+    logger.debug("Uploading to S3", extra={
+        "request_id": request_id,
+        "image_name": image_name
+    })
+    await upload_image_to_s3(final_image_bytes, image_name, encoding.content_type)
+    
+    s3_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{image_name}"
+    
+    response = {
+        "tagline": tagline,
+        "image_url": s3_url,
+        "base_image_id": base_image["id"],
+    }
+
+    if rendition_names:
+        logger.debug("Rendering renditions", extra={
+            "request_id": request_id,
+            "renditions": rendition_names
+        })
+        rendered = await render_renditions(
+            image, rendition_names, tagline, image_style, font, logo_bytes,
+            encoding, base_image["backdrop_color"]
+        )
+        response["renditions"] = await upload_renditions(rendered, image_id, encoding)
+    
+    logger.info("Successfully generated image", extra={
+        "request_id": request_id,
+        "image_url": s3_url
+    })
+    
+    return response
+
+
+@router.post("/regenerate-image", response_model=Dict[str, Any])
 async def regenerate_image(
     purpose: str = Form(...),
     post: str = Form(...),
@@ -66,7 +167,12 @@ async def regenerate_image(
     logo: str = Form(...),
     count: int = Form(...),
     model: Annotated[str, Form(..., min_length=3, max_length=50)] = "claude-3-5-haiku-20241022",
-) -> Dict[str, str]:
+    output_format: str = Form("jpeg"),
+    quality: int = Form(85),
+    target_bytes: Optional[int] = Form(None),
+    renditions: str = Form(""),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+) -> Dict[str, Any]:
     """
     Regenerate an image with text overlay and logo based on input parameters.
     
@@ -80,14 +186,19 @@ async def regenerate_image(
         logo (str): URL of the logo to overlay
         count (int): Number of regeneration attempts
         model (str): AI model to use
+        output_format (str): Encoding of the final image (jpeg, webp or png)
+        quality (int): Encoder quality for lossy formats
+        target_bytes (int, optional): Upper bound on the encoded image size
+        renditions (str, optional): Comma-separated extra aspect ratios to render from the same base image
+        idempotency_key (str, optional): Idempotency-Key header; retries with the same key get the first result
         
     Returns:
-        Dict[str, str]: Dictionary containing tagline and image URL
+        Dict[str, Any]: Dictionary containing tagline, image URL and any rendition URLs
         
     Raises:
         HTTPException: Various exceptions based on the error type
     """
-    request_id = str(uuid.uuid4())
+    request_id = get_request_id()
     logger.info("Starting image regeneration request", extra={
         "request_id": request_id,
         "business_name": bzname,
@@ -97,6 +208,8 @@ async def regenerate_image(
     try:
         # Validate inputs
         validate_inputs(post, bzname, style, logo, count)
+        encoding = OutputEncoding(output_format=output_format, quality=quality, target_bytes=target_bytes)
+        rendition_names = parse_renditions(renditions)
         
         # Initialize regeneration item
         item = RegenerationImage(
@@ -109,74 +222,24 @@ async def regenerate_image(
             model=model
         )
         
-        # Generate tagline
-        logger.debug("Generating tagline", extra={"request_id": request_id})
-        tagline_prompt = build_prompt_tagline_no_purpose(item, post)
-        tagline_response = fetch_response(tagline_prompt, "claude-3-5-sonnet-20241022")
-        if not tagline_response or not tagline_response.content:
-            raise ValueError("Failed to generate tagline")
-        tagline = tagline_response.content[0].text
-
-        logo_bytes = await download_image_from_url(logo)
-        output_image = Image.open(io.BytesIO(logo_bytes)).convert("RGBA")
-
-        color_proportions = extract_color_proportions(output_image)
-        colors = ", ".join([ sub['colorCode'] for sub in color_proportions ])
-        
-        # Generate image prompt
-        logger.debug("Generating image prompt", extra={"request_id": request_id})
-        image_prompt_dynamic = build_dynamic_image_prompt_purpose(post, item.style, item.purpose, colors)
-        image_prompt_response = fetch_response(image_prompt_dynamic, "claude-3-5-sonnet-20241022")
-        if not image_prompt_response or not image_prompt_response.content:
-            raise ValueError("Failed to generate image prompt")
-        image_prompt = image_prompt_response.content[0].text
-        
-        # Generate and process image
-        logger.debug("Generating base image", extra={"request_id": request_id})
-        image = fetch_image_response(image_prompt, "ultra")
-        
-        # Determine color theme
-        if not item.style or item.style == "digital" or "#" not in item.style:
-            image_style = generate_random_hex_color()
-        else:
-            image_style = item.style.split(",")[0].strip()
-        
-        # Add overlays
-        logger.debug("Adding text overlay", extra={"request_id": request_id})
-        font_prompt = build_prompt_font_selection(item, tagline, FONT_LIST)
-
-        logger.info(f"Generated font prompt: {font_prompt}")
-
-        model_font = fetch_response(font_prompt, item.model)
+        if not idempotency_key:
+            return await build_regenerated_image(item, post, logo, encoding, rendition_names, request_id)
 
-        font = get_valid_font(model_font.content[0].text, FONT_LIST)
-
-        logger.info(f"Generated font: {font}")
-
-        final_image_bytes = add_text_overlay(image, tagline, image_style, font, logo_bytes)
-        
-        logger.debug("Downloading and adding logo", extra={"request_id": request_id})
-        # final_image_bytes = overlay_logo(text_image, logo_bytes)
-        
-        # Upload to S3
-        image_name = f"gen_post_{uuid.uuid4().hex}.jpeg"
-        logger.debug("Uploading to S3", extra={
-            "request_id": request_id,
-            "image_name": image_name
-        })
-        await upload_image_to_s3(final_image_bytes, image_name)
-        
-        s3_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{image_name}"
-        
-        logger.info("Successfully generated image", extra={
-            "request_id": request_id,
-            "image_url": s3_url
+        # A client retrying after a timeout gets the first attempt's image instead of a new one
+        fingerprint = request_fingerprint({
+            "item": item.dict(), "post": post, "logo": logo, "count": count,
+            "encoding": encoding.dict(), "renditions": rendition_names,
         })
+        return await idempotency_store.run(
+            "regenerate-image", idempotency_key, fingerprint,
+            lambda: build_regenerated_image(item, post, logo, encoding, rendition_names, request_id)
+        )
         
-        return {
-            "tagline": tagline,
-            "image_url": s3_url,
-        }
+    except IdempotencyConflict as conflict:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(conflict)
+        )
         
     except ValueError as e:
         error_msg = str(e)
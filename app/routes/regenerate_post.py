@@ -1,20 +1,21 @@
 from fastapi import APIRouter, HTTPException, Form, status
 from typing_extensions import Annotated, Optional
-from typing import Dict, Union
-import uuid
+from typing import Any, Dict
 import traceback
 
 from app.models.regeneration_item import RegenerationItem
-from app.services.prompt_building import build_prompt_regeneration
-from app.services.api_calls import fetch_response
-from app.core.logger import logger
+from app.services.post_regeneration import regenerate_candidates
+from app.core.config import REGENERATE_MAX_CANDIDATES
+from app.core.logger import logger, get_request_id
+from app.utils.validate_model import validate_model
 
 router = APIRouter()
 
 def validate_inputs(
     post: str,
     count: int,
-    model: str
+    model: str,
+    n: int = 1
 ) -> None:
     """Validate input parameters before processing."""
     if not post.strip():
@@ -25,53 +26,47 @@ def validate_inputs(
         
     if count >= 2:
         raise ValueError("Cannot regenerate more than 2 times")
-    
-    supported_models = {
-        "claude-3-5-haiku-20241022",
-        "claude-3-5-sonnet-20241022",
-    }
 
-    if model not in supported_models:
-        raise ValueError(f"Unsupported model. Must be one of: {', '.join(supported_models)}")
+    if n < 1 or n > REGENERATE_MAX_CANDIDATES:
+        raise ValueError(f"n must be between 1 and {REGENERATE_MAX_CANDIDATES}")
 
-def validate_api_response(response) -> None:
-    """Validate the API response structure."""
-    if not response or not response.content:
-        raise ValueError("Empty response from API")
-    if not response.usage or not hasattr(response.usage, 'input_tokens') or not hasattr(response.usage, 'output_tokens'):
-        raise ValueError("Invalid token usage information in response")
+    validate_model(model)
 
-@router.post("/regenerate-post", response_model=Dict[str, Union[str, int]])
+@router.post("/regenerate-post", response_model=Dict[str, Any])
 async def regenerate_post(
     post: str = Form(...),
     suggestion: Optional[str] = Form(None),
     count: int = Form(...),
     model: Annotated[str, Form(..., min_length=3, max_length=50)] = "claude-3-5-haiku-20241022",
-) -> Dict[str, Union[str, int]]:
+    n: int = Form(1),
+) -> Dict[str, Any]:
     """    
     Args:
         post (str): Original post content
         suggestion (str, optional): Suggestion for regeneration
         count (int): Number of regeneration attempts
         model (str): AI model to use
+        n (int): Number of distinct candidate rewrites to return
         
     Returns:
-        Dict[str, Union[str, int]]: Dictionary containing regenerated post and token usage
+        Dict[str, Any]: The first rewrite as "post", all candidates as "posts",
+        and token usage summed over every call made
         
     Raises:
         HTTPException: Various exceptions based on the error type
     """
-    request_id = str(uuid.uuid4())
+    request_id = get_request_id()
     logger.info("Starting post regeneration request", extra={
         "request_id": request_id,
         "model": model,
         "regeneration_count": count,
+        "candidates": n,
         "has_suggestion": bool(suggestion)
     })
     
     try:
         # Validate inputs
-        validate_inputs(post, count, model)
+        validate_inputs(post, count, model, n)
         
         # Initialize regeneration item
         item = RegenerationItem(
@@ -80,36 +75,24 @@ async def regenerate_post(
             model=model
         )
         
-        # Build and log prompt
-        logger.debug("Building regeneration prompt", extra={"request_id": request_id})
-        prompt = build_prompt_regeneration(item)
-        logger.info("Generated prompt for regeneration", extra={
-            "request_id": request_id,
-            "prompt_length": len(prompt)
-        })
-        
-        # Make API call
         logger.debug("Making API call", extra={
             "request_id": request_id,
             "model": model
         })
-        response = fetch_response(prompt, item.model)
-        
-        # Validate response
-        validate_api_response(response)
-        
-        regenerated_post = response.content[0].text
+        result = await regenerate_candidates(item, n)
+
         logger.info("Successfully regenerated post", extra={
             "request_id": request_id,
-            "input_tokens": response.usage.input_tokens,
-            "output_tokens": response.usage.output_tokens,
-            "response_length": len(regenerated_post)
+            "input_tokens": result["input_tokens"],
+            "output_tokens": result["output_tokens"],
+            "candidates": len(result["posts"])
         })
-        
+
         return {
-            "post": regenerated_post,
-            "input_tokens": response.usage.input_tokens,
-            "output_tokens": response.usage.output_tokens,
+            "post": result["posts"][0],
+            "posts": result["posts"],
+            "input_tokens": result["input_tokens"],
+            "output_tokens": result["output_tokens"],
         }
         
     except ValueError as e:
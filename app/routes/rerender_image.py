@@ -0,0 +1,137 @@
+from fastapi import APIRouter, HTTPException, Form, status
+from typing_extensions import Optional
+from typing import Dict, Any
+import asyncio
+import uuid
+import traceback
+
+from app.core.logger import logger, get_request_id
+from app.models.output_encoding import OutputEncoding
+from app.services.base_image_store import base_image_store
+from app.services.image_processing import add_text_overlay
+from app.services.placement import TEXT_POSITIONS
+from app.services.renditions import parse_renditions, render_renditions, upload_renditions
+from app.services.s3 import upload_image_to_s3, BUCKET_NAME
+from app.utils.constants import FONT_LIST
+from app.utils.download_image_from_url import download_image_from_url
+from app.utils.validate_font import get_valid_font
+
+router = APIRouter()
+
+def validate_inputs(tagline: str, logo: str, position: Optional[str]) -> None:
+    """Validate input parameters before processing."""
+    if not tagline.strip():
+        raise ValueError("Tagline cannot be empty")
+
+    if not logo.startswith(("http://", "https://")):
+        raise ValueError("Invalid logo URL format")
+
+    if position and position not in TEXT_POSITIONS:
+        raise ValueError(f"Position must be one of: {', '.join(TEXT_POSITIONS)}")
+
+@router.post("/rerender-image", response_model=Dict[str, Any])
+async def rerender_image(
+    base_image_id: str = Form(...),
+    tagline: str = Form(...),
+    logo: str = Form(...),
+    font: Optional[str] = Form(None),
+    position: Optional[str] = Form(None),
+    output_format: str = Form("jpeg"),
+    quality: int = Form(85),
+    target_bytes: Optional[int] = Form(None),
+    renditions: str = Form(""),
+) -> Dict[str, Any]:
+    """
+    Re-render the tagline and logo on a stored base image without calling any model.
+
+    Args:
+        base_image_id (str): Id returned as base_image_id by the generation endpoints
+        tagline (str): Tagline to overlay
+        logo (str): URL of the logo to overlay
+        font (str, optional): Font file name from the font list
+        position (str, optional): Fixed tagline position; picked automatically when omitted
+        output_format (str): Encoding of the final image (jpeg, webp or png)
+        quality (int): Encoder quality for lossy formats
+        target_bytes (int, optional): Upper bound on the encoded image size
+        renditions (str, optional): Comma-separated extra aspect ratios to render
+
+    Returns:
+        Dict[str, Any]: Dictionary containing tagline, image URL and any rendition URLs
+
+    Raises:
+        HTTPException: Various exceptions based on the error type
+    """
+    request_id = get_request_id()
+    logger.info("Starting image re-render request", extra={
+        "request_id": request_id,
+        "base_image_id": base_image_id
+    })
+
+    try:
+        validate_inputs(tagline, logo, position)
+        encoding = OutputEncoding(output_format=output_format, quality=quality, target_bytes=target_bytes)
+        rendition_names = parse_renditions(renditions)
+        font_file = get_valid_font(font or "", FONT_LIST)
+
+        image, metadata = await base_image_store.get(base_image_id)
+        logo_bytes = await download_image_from_url(logo)
+
+        logger.debug("Adding text overlay", extra={"request_id": request_id})
+        final_image_bytes = await asyncio.to_thread(
+            add_text_overlay, image, tagline, None, font_file, logo_bytes,
+            encoding, metadata["backdrop_color"], position
+        )
+
+        image_id = uuid.uuid4().hex
+        image_name = f"gen_post_{image_id}.{encoding.extension}"
+        await upload_image_to_s3(final_image_bytes, image_name, encoding.content_type)
+        s3_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{image_name}"
+
+        response = {
+            "tagline": tagline,
+            "image_url": s3_url,
+            "base_image_id": base_image_id,
+        }
+
+        if rendition_names:
+            rendered = await render_renditions(
+                image, rendition_names, tagline, None, font_file, logo_bytes,
+                encoding, metadata["backdrop_color"], position
+            )
+            response["renditions"] = await upload_renditions(rendered, image_id, encoding)
+
+        logger.info("Successfully re-rendered image", extra={
+            "request_id": request_id,
+            "image_url": s3_url
+        })
+
+        return response
+
+    except ValueError as e:
+        error_msg = str(e)
+        logger.warning("Validation error", extra={
+            "request_id": request_id,
+            "error": error_msg
+        })
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_msg
+        )
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        error_msg = "An unexpected error occurred while re-rendering the image"
+        logger.error(
+            error_msg,
+            extra={
+                "request_id": request_id,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error_msg
+        )
@@ -1,49 +1,176 @@
 from fastapi import HTTPException
-import anthropic
-from app.core.config import ANTHROPIC_API_KEY, STABILITY_API_KEY
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from app.core.config import ANTHROPIC_API_KEY, STABILITY_API_KEY, PROVIDER_THREADS
 from app.core.logger import logger
+from app.services.rate_limiter import rate_limiter, estimate_tokens, PRIORITY_INTERACTIVE
+from app.utils.validate_model import validate_model
+from typing import Optional
 import requests
+import time
 
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+@lru_cache(maxsize=1)
+def get_client():
+    # The SDK takes about a second to import, so it is loaded on first use or by the warm-up
+    import anthropic
+    return anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
-def fetch_response(prompt: str, model: str) -> str:
+SYSTEM_PROMPT = "You are a professional social media content creator. Your job is to create posts that strictly adhere to the given instructions and data. Avoid assumptions or additions like promotions, comparisons, or any phrases not explicitly mentioned in the input. Your output must be polished, factual, and directly publishable. Use only the provided information and omit any unnecessary details or speculative content."
+MAX_TOKENS = 1024
+
+# Provider HTTP calls block a thread for as long as they (or a stream) run; they get a
+# pool of their own so they cannot starve the default executor the routes use for image work
+_provider_executor = ThreadPoolExecutor(max_workers=PROVIDER_THREADS, thread_name_prefix="provider")
+
+async def run_provider_call(fn, *args):
+    """Run a blocking provider call on the provider pool, keeping the caller's context (request id)."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_provider_executor, context.run, fn, *args)
+
+def _create_message(prompt: str, model: str, max_tokens: int):
+    response = get_client().messages.create(
+        model=model,
+        system=SYSTEM_PROMPT,
+        max_tokens=max_tokens,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+    )
+    if hasattr(response, "error") and response.error:
+        logger.error(f"Anthropic API error: {response.error}")
+        raise ValueError("Error in API response")
+    return response
+
+def _client_error(e: Exception) -> Optional[HTTPException]:
+    """Anthropic 4xx errors other than 429 (bad request, unknown model, auth) fail the same on any retry."""
+    status_code = getattr(e, "status_code", None)
+    if isinstance(status_code, int) and 400 <= status_code < 500 and status_code != 429:
+        return HTTPException(status_code=status_code, detail=f"Anthropic API rejected the request: {e}")
+    return None
+
+async def fetch_response(prompt: str, model: str, priority: int = PRIORITY_INTERACTIVE,
+                         max_tokens: int = MAX_TOKENS, timing: Optional[dict] = None):
+    """
+    Rate-limited completion. When given, `timing["seconds"]` is set to the provider
+    call alone, excluding any wait in the rate limiter.
+    """
+    validate_model(model)
+    estimated_tokens = estimate_tokens(SYSTEM_PROMPT + prompt, max_tokens)
+    await rate_limiter.acquire("anthropic", model, estimated_tokens, priority)
+    started = time.monotonic()
     try:
-        response = client.messages.create(
-            model=model,
-            system="You are a professional social media content creator. Your job is to create posts that strictly adhere to the given instructions and data. Avoid assumptions or additions like promotions, comparisons, or any phrases not explicitly mentioned in the input. Your output must be polished, factual, and directly publishable. Use only the provided information and omit any unnecessary details or speculative content.",
-            max_tokens=1024,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-        )
-        if hasattr(response, "error") and response.error:
-            logger.error(f"Anthropic API error: {response.error}")
-            raise ValueError("Error in API response")
-        return response
+        response = await run_provider_call(_create_message, prompt, model, max_tokens)
     except Exception as e:
         logger.error(f"Error while fetching response: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+        raise _client_error(e) or HTTPException(status_code=500, detail="Internal Server Error")
+    finally:
+        if timing is not None:
+            timing["seconds"] = time.monotonic() - started
+    rate_limiter.record_usage(
+        "anthropic", model, estimated_tokens,
+        response.usage.input_tokens + response.usage.output_tokens
+    )
+    return response
+
+class _StreamAbandoned(Exception):
+    """Raised inside the streaming thread once the consumer has stopped reading."""
+
+def _stream_message(prompt: str, model: str, on_text):
+    with get_client().messages.stream(
+        model=model,
+        system=SYSTEM_PROMPT,
+        max_tokens=MAX_TOKENS,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+    ) as stream:
+        for text in stream.text_stream:
+            on_text(text)
+        return stream.get_final_message()
+
+async def astream_response(prompt: str, model: str, priority: int = PRIORITY_INTERACTIVE):
+    """
+    Yield text deltas from a streamed completion as they arrive; the blocking stream
+    runs on the provider pool. If the consumer stops early (closes the generator or
+    is cancelled) the stream is closed at the next delta, and the rate limiter is
+    reconciled with the real usage, or an estimate of it for an abandoned stream.
+    """
+    validate_model(model)
+    estimated_tokens = estimate_tokens(SYSTEM_PROMPT + prompt, MAX_TOKENS)
+    await rate_limiter.acquire("anthropic", model, estimated_tokens, priority)
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+    abandoned = threading.Event()
+    streamed_chars = [0]
+
+    def on_text(text: str):
+        if abandoned.is_set():
+            # Leaving the stream's context manager closes the HTTP response
+            raise _StreamAbandoned()
+        streamed_chars[0] += len(text)
+        loop.call_soon_threadsafe(queue.put_nowait, text)
+
+    def reconcile(finished: asyncio.Future):
+        if not finished.cancelled() and finished.exception() is None:
+            usage = finished.result().usage
+            actual_tokens = usage.input_tokens + usage.output_tokens
+        else:
+            actual_tokens = estimate_tokens(SYSTEM_PROMPT + prompt) + streamed_chars[0] // 4
+        rate_limiter.record_usage("anthropic", model, estimated_tokens, actual_tokens)
+
+    producer = asyncio.ensure_future(run_provider_call(_stream_message, prompt, model, on_text))
+    producer.add_done_callback(lambda _: queue.put_nowait(done))
+    producer.add_done_callback(reconcile)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        if not producer.done():
+            # The producer ends (and reconciles) when its thread sees the flag; cancelling
+            # the future here would not stop the thread, only lose its usage
+            abandoned.set()
+    try:
+        producer.result()
+    except Exception as e:
+        logger.error(f"Error while streaming response: {e}")
+        raise _client_error(e) or HTTPException(status_code=500, detail="Internal Server Error")
+
+def _post_image(image_prompt: str, model: str):
+    return requests.post(
+        f"https://api.stability.ai/v2beta/stable-image/generate/{model}",
+        headers={
+            "authorization": f"Bearer {STABILITY_API_KEY}",
+            "accept": "image/*"
+        },
+        files={"none": ''},
+        data={
+            "prompt": image_prompt,
+            "output_format": "jpeg",
+        },
+    )
 
-def fetch_image_response(image_prompt: str, model: str):
+async def fetch_image_response(image_prompt: str, model: str, priority: int = PRIORITY_INTERACTIVE,
+                               timing: Optional[dict] = None) -> bytes:
+    await rate_limiter.acquire("stability", model, priority=priority)
+    started = time.monotonic()
     try:
-        response = requests.post(
-            f"https://api.stability.ai/v2beta/stable-image/generate/{model}",
-            headers={
-                "authorization": f"Bearer {STABILITY_API_KEY}",
-                "accept": "image/*"
-            },
-            files={"none": ''},
-            data={
-                "prompt": image_prompt,
-                	
-                "output_format": "jpeg",
-            },
-        )
-        if response.status_code == 200:
-            return response.content
-        raise HTTPException(status_code=response.status_code, detail="Unable to generate image") 
-    except HTTPException as http_exc:
-        raise http_exc
+        response = await run_provider_call(_post_image, image_prompt, model)
+    finally:
+        if timing is not None:
+            timing["seconds"] = time.monotonic() - started
+    if response.status_code == 200:
+        return response.content
+    raise HTTPException(status_code=response.status_code, detail="Unable to generate image")
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from typing import Tuple
+from fastapi import HTTPException
+from PIL import Image
+from app.core.config import BASE_IMAGE_DIR, BASE_IMAGE_CACHE_MAX_FILES
+from app.core.logger import logger
+from app.services.image_processing import extract_color_proportions
+from app.services.s3 import upload_image_to_s3, download_from_s3
+
+S3_PREFIX = "base_images/"
+IMAGE_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def prompt_hash(prompt: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+class BaseImageStore:
+    """
+    Content-addressed store for raw Stability images. The id is the SHA-256 of
+    the image bytes; metadata records the prompt hash, model and backdrop colour
+    so an overlay-only re-render needs no model call and no colour extraction.
+    A bounded local directory fronts the durable copy in S3. File work runs in
+    worker threads, and the directory is only scanned for eviction once the
+    running file count says it is over budget.
+    """
+
+    def __init__(self, directory: str = BASE_IMAGE_DIR, max_files: int = BASE_IMAGE_CACHE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._uploads = set()
+        self._count = None
+        self._count_lock = threading.Lock()
+        self._directory_ready = False
+
+    def _ensure_directory(self):
+        # Created on first write rather than at import, so importing the app never writes to disk
+        if not self._directory_ready:
+            os.makedirs(self.directory, exist_ok=True)
+            self._directory_ready = True
+
+    def _paths(self, image_id: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, image_id)
+        return base + ".jpeg", base + ".json"
+
+    def _write_local(self, image_id: str, image_bytes: bytes, metadata: dict):
+        self._ensure_directory()
+        image_path, metadata_path = self._paths(image_id)
+        is_new = not os.path.exists(image_path)
+        with open(image_path, "wb") as f:
+            f.write(image_bytes)
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f)
+        with self._count_lock:
+            if self._count is None:
+                self._count = self._scan_count()
+            elif is_new:
+                self._count += 1
+            if self._count > self.max_files:
+                self._count = self._evict()
+
+    def _read_local(self, image_id: str):
+        image_path, metadata_path = self._paths(image_id)
+        try:
+            os.utime(image_path)
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        except FileNotFoundError:
+            # Not cached, or evicted by a concurrent write
+            return None
+        return image_bytes, metadata
+
+    def _scan_count(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".jpeg"))
+
+    def _evict(self) -> int:
+        """Drop the least recently used images over max_files; returns how many remain."""
+        images = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory) if name.endswith(".jpeg")
+        ]
+        if len(images) <= self.max_files:
+            return len(images)
+        images.sort(key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0.0)
+        for image_path in images[:len(images) - self.max_files]:
+            for path in (image_path, image_path[:-len(".jpeg")] + ".json"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return self.max_files
+
+    async def _upload(self, image_id: str, image_bytes: bytes, metadata: dict):
+        try:
+            await upload_image_to_s3(image_bytes, f"{S3_PREFIX}{image_id}.jpeg", "image/jpeg")
+            await upload_image_to_s3(json.dumps(metadata).encode("utf-8"), f"{S3_PREFIX}{image_id}.json", "application/json")
+        except Exception as e:
+            logger.error(f"Error while persisting base image {image_id}: {e}")
+
+    def _put_local(self, image_id: str, image_bytes: bytes, prompt: str, model: str) -> Tuple[dict, bool]:
+        """Metadata for the image, computed and written unless cached; returns (metadata, created)."""
+        cached = self._read_local(image_id)
+        if cached:
+            return cached[1], False
+
+        image = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
+        metadata = {
+            "id": image_id,
+            "prompt_hash": prompt_hash(prompt, model),
+            "model": model,
+            "backdrop_color": extract_color_proportions(image)[0]["colorCode"],
+            "created_at": int(time.time()),
+        }
+        self._write_local(image_id, image_bytes, metadata)
+        return metadata, True
+
+    async def put(self, image_bytes: bytes, prompt: str, model: str) -> dict:
+        """Store a base image and return its metadata, including its id."""
+        image_id = hashlib.sha256(image_bytes).hexdigest()
+        metadata, created = await asyncio.to_thread(self._put_local, image_id, image_bytes, prompt, model)
+        if not created:
+            return metadata
+
+        # S3 persistence runs in the background so it stays off the request path
+        task = asyncio.create_task(self._upload(image_id, image_bytes, metadata))
+        self._uploads.add(task)
+        task.add_done_callback(self._uploads.discard)
+        return metadata
+
+    async def drain(self):
+        """Wait for pending background S3 uploads, e.g. before a batch process exits."""
+        if self._uploads:
+            await asyncio.gather(*list(self._uploads), return_exceptions=True)
+
+    async def get(self, image_id: str) -> Tuple[bytes, dict]:
+        if not IMAGE_ID_PATTERN.match(image_id or ""):
+            raise ValueError("Invalid base image id")
+
+        cached = await asyncio.to_thread(self._read_local, image_id)
+        if cached:
+            return cached
+
+        try:
+            image_bytes = await download_from_s3(f"{S3_PREFIX}{image_id}.jpeg")
+            metadata = json.loads(await download_from_s3(f"{S3_PREFIX}{image_id}.json"))
+        except HTTPException as http_exc:
+            if http_exc.status_code == 404:
+                raise HTTPException(status_code=404, detail="Base image not found")
+            raise
+        await asyncio.to_thread(self._write_local, image_id, image_bytes, metadata)
+        return image_bytes, metadata
+
+base_image_store = BaseImageStore()
@@ -0,0 +1,102 @@
+import io
+import os
+import string
+import threading
+from functools import lru_cache
+from typing import Dict
+from PIL import ImageFont
+from app.core.logger import logger
+from app.utils.constants import FONT_LIST
+
+FONTS_DIR = "./fonts"
+DEFAULT_FONT = "NotoSans-Medium.ttf"
+METRICS_SIZE = 100
+
+class FontRecord:
+    def __init__(self, name: str, data: bytes, metrics: dict):
+        self.name = name
+        self.data = data
+        self.metrics = metrics
+
+class FontRegistry:
+    """
+    Loads every font in fonts/ into memory once, validates it and computes
+    size-independent metrics. Renders get cached FreeTypeFont objects built
+    from the in-memory bytes, so they never touch the filesystem.
+    """
+
+    def __init__(self, fonts_dir: str = FONTS_DIR):
+        self.fonts_dir = fonts_dir
+        self.fonts: Dict[str, FontRecord] = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self.loaded:
+                return
+            fonts = {}
+            for name in sorted(os.listdir(self.fonts_dir)):
+                if not name.lower().endswith((".ttf", ".otf")):
+                    continue
+                try:
+                    with open(os.path.join(self.fonts_dir, name), "rb") as f:
+                        data = f.read()
+                    fonts[name] = FontRecord(name, data, self._compute_metrics(data))
+                except Exception as e:
+                    logger.error(f"Invalid font {name}: {e}")
+
+            missing = [name for name in FONT_LIST if name not in fonts]
+            if missing:
+                logger.error(f"Fonts listed in FONT_LIST but not loadable: {', '.join(missing)}")
+            if DEFAULT_FONT not in fonts:
+                raise ValueError(f"Default font {DEFAULT_FONT} is missing or invalid")
+
+            self.fonts = fonts
+            self.loaded = True
+            logger.info(f"Font registry loaded {len(fonts)} fonts")
+
+    @staticmethod
+    def _compute_metrics(data: bytes) -> dict:
+        font = ImageFont.truetype(io.BytesIO(data), METRICS_SIZE)
+        ascent, descent = font.getmetrics()
+        x_bbox = font.getbbox("x")
+        cap_bbox = font.getbbox("H")
+        average_advance = sum(font.getlength(c) for c in string.ascii_letters) / len(string.ascii_letters)
+        family, style = font.getname()
+        # Metrics are expressed as a fraction of the font size
+        return {
+            "family": family,
+            "style": style,
+            "average_advance": average_advance / METRICS_SIZE,
+            "space_advance": font.getlength(" ") / METRICS_SIZE,
+            "x_height": (x_bbox[3] - x_bbox[1]) / METRICS_SIZE,
+            "cap_height": (cap_bbox[3] - cap_bbox[1]) / METRICS_SIZE,
+            "ascent": ascent / METRICS_SIZE,
+            "descent": descent / METRICS_SIZE,
+        }
+
+    def resolve(self, font: str) -> str:
+        """Map a font name or ./fonts/ path to a registered font name, falling back to the default."""
+        self.load()
+        name = os.path.basename(font.strip())
+        if name in self.fonts:
+            return name
+        logger.warning(f"Font {font} not registered, using {DEFAULT_FONT}")
+        return DEFAULT_FONT
+
+    def has(self, font: str) -> bool:
+        self.load()
+        return os.path.basename(font.strip()) in self.fonts
+
+    def metrics(self, font: str) -> dict:
+        return self.fonts[self.resolve(font)].metrics
+
+    def get_font(self, font: str, size: int) -> ImageFont.FreeTypeFont:
+        return self._get_font(self.resolve(font), size)
+
+    @lru_cache(maxsize=512)
+    def _get_font(self, name: str, size: int) -> ImageFont.FreeTypeFont:
+        return ImageFont.truetype(io.BytesIO(self.fonts[name].data), size)
+
+font_registry = FontRegistry()
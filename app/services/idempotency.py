@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from app.core.config import IDEMPOTENCY_DIR, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_LOCK_TIMEOUT
+from app.core.logger import logger
+
+IDEMPOTENCY_KEY_PATTERN = re.compile(r"^[\x21-\x7e]{1,255}$")
+POLL_INTERVAL = 0.5
+PURGE_INTERVAL = 600
+
+class IdempotencyConflict(ValueError):
+    """The key was already used for a request with different parameters."""
+
+def request_fingerprint(fields: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class IdempotencyStore:
+    """
+    Results of generation requests keyed by (endpoint, Idempotency-Key), kept on local
+    disk for a TTL so every worker on the host sees them. While the first attempt runs,
+    a lock file marks the key: retries in the same worker attach to the running task,
+    retries in another worker poll until the result is written. Failed attempts are not
+    stored, so a retry after an error runs again.
+    """
+
+    def __init__(self, directory: str = IDEMPOTENCY_DIR, ttl: int = IDEMPOTENCY_TTL_SECONDS,
+                 lock_timeout: int = IDEMPOTENCY_LOCK_TIMEOUT):
+        self.directory = directory
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._inflight: Dict[str, Tuple[str, asyncio.Task]] = {}
+        self._last_purge = 0.0
+        self._directory_ready = False
+
+    def _ensure_directory(self):
+        # Created on first use rather than at import, so importing the app never writes to disk
+        if not self._directory_ready:
+            os.makedirs(self.directory, exist_ok=True)
+            self._directory_ready = True
+
+    def _paths(self, digest: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, digest)
+        return base + ".json", base + ".lock"
+
+    def _read_result(self, digest: str, fingerprint: str) -> Optional[dict]:
+        result_path, _ = self._paths(digest)
+        try:
+            with open(result_path) as f:
+                record = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if record["expires_at"] < time.time():
+            return None
+        if record["fingerprint"] != fingerprint:
+            raise IdempotencyConflict("Idempotency-Key was already used with different request parameters")
+        return record["result"]
+
+    def _write_result(self, digest: str, fingerprint: str, result: dict):
+        result_path, _ = self._paths(digest)
+        record = {"fingerprint": fingerprint, "expires_at": time.time() + self.ttl, "result": result}
+        temporary_path = f"{result_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(record, f)
+        os.replace(temporary_path, result_path)
+
+    def _try_lock(self, digest: str, fingerprint: str) -> bool:
+        _, lock_path = self._paths(digest)
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            json.dump({"pid": os.getpid(), "started": time.time(), "fingerprint": fingerprint}, f)
+        return True
+
+    def _check_lock(self, digest: str, fingerprint: str) -> bool:
+        """True while another live process is running this key; clears stale locks."""
+        _, lock_path = self._paths(digest)
+        try:
+            with open(lock_path) as f:
+                lock = json.load(f)
+        except FileNotFoundError:
+            return False
+        except json.JSONDecodeError:
+            # Written by os.open + dump, so an empty or partial file is normally a lock being
+            # created right now; one that stays unreadable past the timeout lost its owner
+            # between the two calls
+            try:
+                age = time.time() - os.path.getmtime(lock_path)
+            except FileNotFoundError:
+                return False
+            if age < self.lock_timeout:
+                return True
+            logger.warning("Clearing unreadable stale idempotency lock")
+            self._release(digest)
+            return False
+        if lock.get("fingerprint") != fingerprint:
+            raise IdempotencyConflict("Idempotency-Key is in use by a request with different parameters")
+        if time.time() - lock["started"] < self.lock_timeout and _pid_alive(lock["pid"]):
+            return True
+        # The owner crashed or hung. Two pollers may both clear it and both run, which is
+        # no worse than having no key; O_EXCL still admits one of them per round.
+        logger.warning(f"Clearing stale idempotency lock held by pid {lock['pid']}")
+        self._release(digest)
+        return False
+
+    def _release(self, digest: str):
+        _, lock_path = self._paths(digest)
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+
+    def _purge(self):
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            limit = self.ttl if name.endswith(".json") else self.lock_timeout
+            try:
+                if now - os.path.getmtime(path) > limit:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _claim(self, digest: str, fingerprint: str) -> Tuple[str, Optional[dict]]:
+        """
+        One pass over the key's files: ("stored", result) to replay, ("locked", None)
+        when this call now holds the lock, ("busy", None) while another attempt runs.
+        """
+        self._ensure_directory()
+        result = self._read_result(digest, fingerprint)
+        if result is not None:
+            return "stored", result
+
+        if self._try_lock(digest, fingerprint):
+            # Another worker may have stored the result and unlocked since the read above
+            try:
+                result = self._read_result(digest, fingerprint)
+            except IdempotencyConflict:
+                self._release(digest)
+                raise
+            if result is None:
+                return "locked", None
+            self._release(digest)
+            return "stored", result
+        return ("busy" if self._check_lock(digest, fingerprint) else "retry"), None
+
+    def _finish(self, digest: str, fingerprint: str, result: Optional[dict]):
+        try:
+            if result is not None:
+                self._write_result(digest, fingerprint, result)
+        finally:
+            self._release(digest)
+            self._purge()
+
+    async def _execute(self, digest: str, fingerprint: str, factory: Callable[[], Awaitable[dict]]) -> dict:
+        result = None
+        try:
+            result = await factory()
+            return result
+        finally:
+            # File work runs in a thread so a slow disk does not stall the event loop
+            await asyncio.to_thread(self._finish, digest, fingerprint, result)
+
+    def _forget(self, digest: str, task: asyncio.Task):
+        if self._inflight.get(digest, (None, None))[1] is task:
+            del self._inflight[digest]
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, scope: str, key: str, fingerprint: str, factory: Callable[[], Awaitable[dict]]) -> dict:
+        """Run factory once per (scope, key) within the TTL and return its (stored) result."""
+        if not IDEMPOTENCY_KEY_PATTERN.match(key):
+            raise ValueError("Idempotency-Key must be 1-255 visible ASCII characters")
+        digest = hashlib.sha256(f"{scope}\n{key}".encode("utf-8")).hexdigest()
+
+        while True:
+            inflight = self._inflight.get(digest)
+            if inflight:
+                if inflight[0] != fingerprint:
+                    raise IdempotencyConflict("Idempotency-Key is in use by a request with different parameters")
+                logger.info(f"Attaching {scope} retry to the attempt in progress")
+                return await asyncio.shield(inflight[1])
+
+            state, result = await asyncio.to_thread(self._claim, digest, fingerprint)
+            if state == "stored":
+                logger.info(f"Replaying stored {scope} result for a retried request")
+                return result
+            if state == "locked":
+                break
+            if state == "busy":
+                await asyncio.sleep(POLL_INTERVAL)
+
+        # The attempt runs in its own task so it finishes (and is stored) even if the
+        # client that started it disconnects before the response is sent
+        task = asyncio.create_task(self._execute(digest, fingerprint, factory))
+        self._inflight[digest] = (fingerprint, task)
+        task.add_done_callback(lambda finished: self._forget(digest, finished))
+        return await asyncio.shield(task)
+
+idempotency_store = IdempotencyStore()
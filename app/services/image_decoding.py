@@ -0,0 +1,61 @@
+import io
+from functools import lru_cache
+from typing import Optional, Tuple
+from PIL import Image
+from app.core.config import MAX_IMAGE_PIXELS
+
+# Colour analysis and background removal do not need more detail than this
+ANALYSIS_MAX_SIDE = 512
+REMBG_MAX_SIDE = 1024
+
+# Let Pillow refuse decompression bombs outright as well
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+def probe(image_bytes: bytes) -> Image.Image:
+    """Open an image reading only its header, and reject it if it exceeds the pixel limit."""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+    except Image.DecompressionBombError:
+        raise ValueError(f"Image exceeds the {MAX_IMAGE_PIXELS} pixel limit")
+    except Exception as e:
+        raise ValueError(f"Unsupported or corrupt image: {e}")
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ValueError(f"Image is too large: {width}x{height} exceeds the {MAX_IMAGE_PIXELS} pixel limit")
+    return image
+
+def image_size(image_bytes: bytes) -> Tuple[int, int]:
+    return probe(image_bytes).size
+
+def decode_image(image_bytes: bytes, max_side: Optional[int] = None, mode: str = "RGBA") -> Image.Image:
+    """
+    Decode an image no larger than max_side on its long edge. JPEGs are decoded at a
+    reduced DCT scale (draft) and other formats are shrunk with reduce() right after
+    decoding, so a large upload never exists as a full-size RGBA copy.
+    """
+    image = probe(image_bytes)
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return image.convert(mode)
+
+def shrink_for_analysis(image: Image.Image, max_side: int = ANALYSIS_MAX_SIDE) -> Image.Image:
+    """Downscaled copy of an already decoded image for colour statistics."""
+    if max(image.size) <= max_side:
+        return image
+    image = image.copy()
+    image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return image
+
+@lru_cache(maxsize=32)
+def logo_at_width(logo_bytes: bytes, width: int) -> Image.Image:
+    """
+    Logo decoded and resized to `width` pixels wide, memoised so every post of a
+    bulk job reuses one decode. Callers must treat the result as read-only.
+    """
+    header_width, header_height = image_size(logo_bytes)
+    height = max(int(width * header_height / header_width), 1)
+    # Decode at no less than twice the target so the final LANCZOS pass keeps its quality
+    logo = decode_image(logo_bytes, max_side=max(width, height) * 2)
+    logo = logo.resize((width, height), Image.Resampling.LANCZOS)
+    logo.load()
+    return logo
@@ -0,0 +1,48 @@
+import io
+from PIL import Image
+from app.core.logger import logger
+from app.models.output_encoding import OutputEncoding
+from app.utils.constants import OUTPUT_FORMATS
+
+MIN_QUALITY = 40
+
+def _save(image: Image.Image, output_format: str, quality: int) -> bytes:
+    output_buffer = io.BytesIO()
+    pil_format = OUTPUT_FORMATS[output_format]["pil_format"]
+    if output_format == "jpeg":
+        image.save(output_buffer, format=pil_format, quality=quality, optimize=True)
+    elif output_format == "webp":
+        image.save(output_buffer, format=pil_format, quality=quality, method=4)
+    else:
+        image.save(output_buffer, format=pil_format)
+    return output_buffer.getvalue()
+
+def encode_image(image: Image.Image, encoding: OutputEncoding) -> bytes:
+    """
+    Encode the final post image. For lossy formats with a target_bytes budget,
+    binary-search the highest quality (down to MIN_QUALITY) that fits it.
+    """
+    if encoding.output_format == "jpeg" and image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if encoding.output_format == "png" or not encoding.target_bytes:
+        return _save(image, encoding.output_format, encoding.quality)
+
+    low, high = min(MIN_QUALITY, encoding.quality), encoding.quality
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        data = _save(image, encoding.output_format, quality)
+        if len(data) <= encoding.target_bytes:
+            best = data
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    if best is None:
+        best = _save(image, encoding.output_format, min(MIN_QUALITY, encoding.quality))
+        logger.warning(
+            f"Could not encode image under {encoding.target_bytes} bytes, "
+            f"sending {len(best)} bytes at minimum quality"
+        )
+    return best
\ No newline at end of file
@@ -1,26 +1,57 @@
-from PIL import Image, ImageDraw, ImageFont, ImageStat
-import rembg
-import extcolors
+from PIL import Image, ImageDraw
 import io
 import random
 import math
+import threading
 import numpy as np
+from app.services import image_decoding, text_layout, placement
+from app.services.image_encoding import encode_image
+from app.services.single_flight import single_flight, content_key
+from app.models.output_encoding import OutputEncoding
+
+# rembg (onnxruntime) and extcolors are imported on first use or by the startup warm-up,
+# so importing this module stays cheap for routes that never touch images
+REMBG_MODEL = "u2net"
+_rembg_session = None
+_rembg_lock = threading.Lock()
+
+def get_rembg_session():
+    """Load the background-removal model once per process and reuse it for every call."""
+    global _rembg_session
+    with _rembg_lock:
+        if _rembg_session is None:
+            from rembg import new_session
+            _rembg_session = new_session(REMBG_MODEL)
+        return _rembg_session
 
 def remove_background(image_bytes: bytes) -> Image.Image:
+    """
+    Background-removed RGBA image. Concurrent calls with the same bytes share one model
+    run and receive the same image object, which callers must not modify.
+    """
+    return single_flight.do(("remove_background", content_key(image_bytes)), _remove_background, image_bytes)
+
+def _remove_background(image_bytes: bytes) -> Image.Image:
     try:
-        # Convert bytes to an image
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
+        # Decode at a bounded size; the segmentation model works on a small input anyway
+        image = image_decoding.decode_image(image_bytes, image_decoding.REMBG_MAX_SIDE)
         # Use rembg to remove the background
-        output_bytes = rembg.remove(image_bytes)
-        # Convert the processed bytes back to an Image object
-        output_image = Image.open(io.BytesIO(output_bytes)).convert("RGBA")
-        return output_image
+        from rembg import remove
+        output_image = remove(image, session=get_rembg_session())
+        return output_image.convert("RGBA")
     except Exception as e:
         raise ValueError(f"Error in background removal: {e}") 
 
 
 def extract_color_proportions(image: Image.Image):
+    # Keyed on the downscaled pixels, so identical logos coalesce whatever object they arrived in
+    image = image_decoding.shrink_for_analysis(image)
+    key = ("color_proportions", image.mode, image.size, content_key(image.tobytes()))
+    return [dict(color) for color in single_flight.do(key, _extract_color_proportions, image)]
+
+def _extract_color_proportions(image: Image.Image):
     try:
+        import extcolors
         colors, pixel_count = extcolors.extract_from_image(image, tolerance=33, limit=3)
         total_pixels = pixel_count
         color_percentages = [
@@ -34,39 +65,21 @@ def extract_color_proportions(image: Image.Image):
     except Exception as e:
         raise ValueError(f"Error in color extraction: {e}")
     
-def overlay_logo(base_image_bytes, logo_bytes, position="bottom-right"):
-    base_image = Image.open(io.BytesIO(base_image_bytes)).convert("RGBA")
-    logo = Image.open(io.BytesIO(logo_bytes)).convert("RGBA")
+def paste_logo(image: Image.Image, logo_bytes: bytes, position: str = "bottom-right") -> Image.Image:
+    """Paste the logo into one corner (or the centre) of an image in place."""
+    logo = image_decoding.logo_at_width(logo_bytes, image.width // 5)
 
-    logo_width = base_image.width // 5
-    logo = logo.resize(
-        (logo_width, int(logo_width * logo.height / logo.width)),
-        Image.Resampling.LANCZOS
-    )
+    if position not in placement.LOGO_CORNERS and position != "center":
+        position = "bottom-right"
+    box = placement.logo_box(position, image.size, logo.size)
 
-    if position == "center":
-        x = (base_image.width - logo.width) // 2
-        y = (base_image.height - logo.height) // 2
-    elif position == "top-left":
-        x = 10 
-        y = 10
-    elif position == "bottom-left":
-        x = 10
-        y = base_image.height - logo.height - 10
-    elif position == "top-right":
-        x = base_image.width - logo.width - 10
-        y = 10
-    else:
-        x = base_image.width - logo.width - 10
-        y = base_image.height - logo.height - 10
-
-    base_image.paste(logo, (x, y), logo)
+    image.paste(logo, (box.x, box.y), logo)
+    return image
 
-    output_buffer = io.BytesIO()
-    base_image.save(output_buffer, format="PNG")
-    output_buffer.seek(0)
-
-    return output_buffer.read()
+def overlay_logo(base_image_bytes, logo_bytes, position="bottom-right", encoding: OutputEncoding = None):
+    base_image = Image.open(io.BytesIO(base_image_bytes)).convert("RGB")
+    paste_logo(base_image, logo_bytes, position)
+    return encode_image(base_image, encoding or OutputEncoding(output_format="png"))
 
 # def get_contrasting_text_color(bg_color):
 #     brightness = (0.299 * bg_color[0] + 0.587 * bg_color[1] + 0.114 * bg_color[2])
@@ -82,130 +95,90 @@ def get_contrasting_text_color(bg_color):
         contrasting_color = tuple(max(c - 50, 0) for c in complementary_color)
     return contrasting_color
 
-def wrap_text(draw, text, font, max_width):
-    lines = []
-    words = text.split()
-    while words:
-        line = words.pop(0)
-        while words and draw.textlength(line + ' ' + words[0], font=font) <= max_width:
-            line += ' ' + words.pop(0)
-        lines.append(line)
-    return '\n'.join(lines)
+def backdrop_alpha(box_width: int, box_height: int, fade_right: bool, base_alpha: int = 180) -> np.ndarray:
+    """
+    Alpha of the text backdrop: a horizontal fade (solid then fading out towards the
+    open side, or fading in then out for right-hand boxes) with a slight vertical
+    swell. Returns a (box_height + 1, box_width + 1) uint8 array; the extra row and
+    column repeat the edge, as the old one-pixel rectangles spilled one pixel over.
+    """
+    columns = np.arange(box_width, dtype=np.float64)
+    fade_start = int(box_width * 0.8) if fade_right else int(box_width * 0.2)
+    fade_out = base_alpha * (1 - (np.maximum(columns - fade_start, 0) / max(box_width - fade_start, 1)) ** 0.95)
+    if fade_right:
+        fade_in = base_alpha - (columns / max(fade_start, 1)) * 10
+    else:
+        fade_in = base_alpha * (columns / max(fade_start, 1))
+    alpha = np.where(columns < fade_start, fade_in, fade_out)
+
+    rows = np.arange(box_height, dtype=np.float64)
+    swell = 0.95 + 0.05 * np.sin(rows / box_height * math.pi)
+    alpha = (swell[:, None] * alpha[None, :]).astype(np.uint8)
+    return np.pad(alpha, ((0, 1), (0, 1)), mode="edge")
 
-def add_text_overlay(image_path, text, bg_color, font_file, logo_bytes):
-    image = Image.open(io.BytesIO(image_path)).convert("RGBA")
+def add_text_overlay(
+    image_path, text, bg_color, font_file, logo_bytes,
+    encoding: OutputEncoding = None, backdrop_color: str = None, text_position: str = None
+):
+    # image_path may be encoded bytes or an already decoded image (e.g. a rendition)
+    if isinstance(image_path, Image.Image):
+        image = image_path.convert("RGB")
+    else:
+        image = Image.open(io.BytesIO(image_path)).convert("RGB")
     width, height = image.size
     image_gray = image.convert('L')
     
     bg_width = int(width * 0.7)
     bg_height = int(height * 0.2)
     
-    positions = [
-        "top-left", "center-left", "bottom-left",
-        "top-right", "center-right", "bottom-right"
-    ]
-    
-    position_scores = []
-    for position in positions:
-        x = 0 if "left" in position else width - bg_width
-        if position.startswith("top"):
-            y = int(height * 0.15)
-        elif position.startswith("center"):
-            y = (height - bg_height) // 2
-        else:
-            y = int(height * 0.75)
-        
-        if x + bg_width > width or y + bg_height > height:
-            continue
-        
-        roi = image_gray.crop((x, y, x + bg_width, y + bg_height))
-        roi_array = np.array(roi)
-        variance = np.var(roi_array)
-        position_scores.append((position, variance))
-    
-    best_position = min(position_scores, key=lambda x: x[1])[0] if position_scores else "top-left"
+    integral = placement.IntegralImage(image_gray)
+    if text_position:
+        text_box = placement.fixed_text_placement(integral, bg_width, bg_height, text_position)
+    else:
+        text_box = placement.find_text_placement(integral, bg_width, bg_height)
+    best_position = text_box.position
     
-    bg_color = extract_color_proportions(image)[0]["colorCode"]
+    bg_color = backdrop_color or extract_color_proportions(image)[0]["colorCode"]
     bg_color = bg_color.lstrip('#')
     bg_color = tuple(int(bg_color[i:i+2], 16) for i in (0, 2, 4))
     
-    bg_x = 0 if "left" in best_position else width - bg_width
-    if best_position.startswith("top"):
-        bg_y = int(height * 0.15)
-    elif best_position.startswith("center"):
-        bg_y = (height - bg_height) // 2
-    else:
-        bg_y = int(height * 0.75)
+    bg_x, bg_y = text_box.x, text_box.y
 
-    base_alpha = 180
-    fade_start = int(bg_width * 0.8) if "left" in best_position else int(bg_width * 0.2)
-    
-    overlay = Image.new("RGBA", image.size, (255, 255, 255, 0))
-    draw = ImageDraw.Draw(overlay)
-    
-    for i in range(bg_width):
-        if "left" in best_position:
-            if i < fade_start:
-                alpha = base_alpha - (i / fade_start) * 10
-            else:
-                alpha = base_alpha * (1 - ((i - fade_start) / (bg_width - fade_start)) ** 0.95)
-        else:
-            if i < fade_start:
-                alpha = base_alpha * (i / fade_start)
-            else:
-                alpha = base_alpha * (1 - ((i - fade_start) / (bg_width - fade_start)) ** 0.95)
-        
-        for j in range(bg_height):
-            vert_alpha = alpha * (0.95 + 0.05 * math.sin(j / bg_height * math.pi))
-            draw.rectangle(
-                [bg_x + i, bg_y + j, bg_x + i + 1, bg_y + j + 1],
-                fill=(*bg_color, int(vert_alpha)),
-            )
-    
-    font_size = 1
-    font = ImageFont.truetype(font_file, font_size)
     max_width, max_height = int(bg_width * 0.95), int(bg_height * 0.8)
-    
-    while True:
-        font = ImageFont.truetype(font_file, font_size)
-        wrapped_text = wrap_text(draw, text, font, max_width)
-        text_width, text_height = draw.textbbox((0, 0), wrapped_text, font=font)[2:]
-        if text_width > max_width or text_height > max_height:
-            break
-        font_size += 1
-    
-    font_size -= 1
-    font = ImageFont.truetype(font_file, font_size)
-    wrapped_text = wrap_text(draw, text, font, max_width)
-    
+    font_size, wrapped_text = text_layout.fit_text(text, font_file, max_width, max_height)
+    font = text_layout.get_font(font_file, font_size)
+
     text_x = bg_x + 25
-    text_y = bg_y + (bg_height - draw.textbbox((0, 0), wrapped_text, font=font)[3]) // 2
+    text_y = bg_y + (bg_height - text_layout.text_bbox(wrapped_text, font)[3]) // 2
     text_color = get_contrasting_text_color(bg_color)
-    draw.text((text_x, text_y), wrapped_text, fill=text_color, font=font)
-    
-    combined = Image.alpha_composite(image, overlay)
-    combined = combined.convert("RGB")
-    
-    output_buffer = io.BytesIO()
-    combined.save(output_buffer, format="PNG")
-    output_buffer.seek(0)
-    
-    logo_position_list = best_position.split("-")
-    logo_position = ""
 
-    if logo_position_list[0] == "top" or logo_position_list[0] == "center":
-        logo_position = "bottom"
-    else:
-        logo_position = "top"
+    # Only the backdrop (plus its one-pixel fringe) and the text are ever drawn, so the
+    # overlay covers just their bounding box and is composited into that region alone
+    text_left, text_top, text_right, text_bottom = text_layout.text_bbox(wrapped_text, font, (text_x, text_y))
+    x0, y0 = min(bg_x, text_left), min(bg_y, text_top)
+    x1, y1 = max(bg_x + bg_width + 1, text_right), max(bg_y + bg_height + 1, text_bottom)
 
-    if logo_position_list[1] == "left":
-        logo_position += "-right"
-    else:
-        logo_position += "-left"
-    
-    print(logo_position)
+    overlay_pixels = np.full((y1 - y0, x1 - x0, 4), (255, 255, 255, 0), dtype=np.uint8)
+    backdrop = overlay_pixels[bg_y - y0:bg_y - y0 + bg_height + 1, bg_x - x0:bg_x - x0 + bg_width + 1]
+    backdrop[..., :3] = bg_color
+    backdrop[..., 3] = backdrop_alpha(bg_width, bg_height, "left" in best_position)
+    overlay = Image.fromarray(overlay_pixels, "RGBA")
+
+    draw = ImageDraw.Draw(overlay)
+    draw.text((text_x - x0, text_y - y0), wrapped_text, fill=text_color, font=font)
+
+    region = (max(x0, 0), max(y0, 0), min(x1, width), min(y1, height))
+    patch = image.crop(region).convert("RGBA")
+    patch.alpha_composite(overlay.crop((region[0] - x0, region[1] - y0, region[2] - x0, region[3] - y0)))
+    image.paste(patch.convert("RGB"), region[:2])
+
+    logo_header_width, logo_header_height = image_decoding.image_size(logo_bytes)
+    logo_width = width // 5
+    logo_size = (logo_width, max(int(logo_width * logo_header_height / logo_header_width), 1))
+    logo_position = placement.choose_logo_position(text_box, image.size, logo_size, integral)
 
-    return overlay_logo(output_buffer.read(), logo_bytes, logo_position)
+    paste_logo(image, logo_bytes, logo_position)
+    return encode_image(image, encoding or OutputEncoding(output_format="png"))
 
 def generate_random_hex_color():
     dominant_channel = random.randint(200, 255)
@@ -0,0 +1,88 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from app.core.config import LOOP_LAG_THRESHOLD_MS
+from app.core.logger import logger
+
+TICK_INTERVAL = 0.1
+STACK_LIMIT = 40
+RECENT_STALLS = 20
+
+class LoopLagWatchdog:
+    """
+    Measures event-loop lag with a ticker task, and watches the ticker from a separate
+    thread: when the loop has not ticked for longer than the threshold, the thread
+    captures what the loop thread is executing right now (the blocking call) and logs it.
+    """
+
+    def __init__(self, threshold_ms: int = LOOP_LAG_THRESHOLD_MS, interval: float = TICK_INTERVAL):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.ticks = 0
+        self.stalls = 0
+        self.recent = deque(maxlen=RECENT_STALLS)
+        self._beat = time.monotonic()
+        self._reported_beat = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start on the running loop; a threshold of 0 disables the watchdog."""
+        if not self.threshold or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._tick())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            self._beat = now
+            self.ticks += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.stalls += 1
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval / 2):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked <= self.threshold or self._reported_beat == beat:
+                continue
+            # Report each stall once, with the stack the loop thread is stuck in
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame else "(loop thread not found)"
+            self.recent.append({"at": time.time(), "blocked_ms": round(blocked * 1000), "stack": stack})
+            logger.warning(f"Event loop blocked for more than {blocked * 1000:.0f} ms; loop thread stack:\n{stack}")
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": round(self.threshold * 1000),
+            "ticks": self.ticks,
+            "mean_lag_ms": round(self.total_lag / self.ticks * 1000, 2) if self.ticks else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stalls,
+            "recent_stalls": list(self.recent),
+        }
+
+loop_watchdog = LoopLagWatchdog()
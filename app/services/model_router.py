@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from app.core.config import MODEL_ROUTES, MODEL_FAILURE_COOLDOWN
+from app.core.logger import logger
+from app.services.api_calls import fetch_response, fetch_image_response
+from app.services.rate_limiter import PRIORITY_INTERACTIVE
+from app.utils.validate_model import validate_model
+
+SONNET = "claude-3-5-sonnet-20241022"
+HAIKU = "claude-3-5-haiku-20241022"
+
+TEXT_STAGES = ("post", "tagline", "image_prompt", "font")
+
+# Per stage: models in order of preference, the latency a model must keep (EWMA, seconds)
+# to stay primary, and the most a call may cost (USD). "models": [] means the model named
+# in the request, followed by "fallbacks".
+DEFAULT_ROUTES: Dict[str, Dict[str, Any]] = {
+    "post": {"models": [], "fallbacks": [HAIKU], "latency_target": 15.0, "cost_target": 0.03},
+    "tagline": {"models": [SONNET, HAIKU], "latency_target": 6.0, "cost_target": 0.01},
+    "image_prompt": {"models": [SONNET, HAIKU], "latency_target": 10.0, "cost_target": 0.02},
+    "font": {"models": [], "fallbacks": [HAIKU], "latency_target": 8.0, "cost_target": 0.02},
+    "image": {"models": ["ultra", "core"], "latency_target": 20.0, "cost_target": 0.08},
+}
+
+# USD per million input/output tokens, or per image for Stability models
+TOKEN_PRICES = {SONNET: (3.0, 15.0), HAIKU: (0.8, 4.0)}
+IMAGE_PRICES = {"ultra": 0.08, "core": 0.03, "sd3": 0.065}
+
+EWMA_ALPHA = 0.2
+# A model demoted for latency or cost gets one request this often, so its stats can recover
+PROBE_INTERVAL = 60.0
+
+def load_routes(override: str = MODEL_ROUTES) -> Dict[str, Dict[str, Any]]:
+    """Default table with any per-stage fields from the MODEL_ROUTES JSON merged over it."""
+    routes = {stage: dict(route) for stage, route in DEFAULT_ROUTES.items()}
+    if not override:
+        return routes
+    try:
+        configured = json.loads(override)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"MODEL_ROUTES is not valid JSON: {e}")
+    for stage, route in configured.items():
+        routes.setdefault(stage, {"models": [], "latency_target": 30.0, "cost_target": 1.0}).update(route)
+    for stage in TEXT_STAGES:
+        for model in routes[stage]["models"] + routes[stage].get("fallbacks", []):
+            validate_model(model)
+    return routes
+
+def response_cost(model: str, response) -> float:
+    input_price, output_price = TOKEN_PRICES.get(model, TOKEN_PRICES[SONNET])
+    return (response.usage.input_tokens * input_price + response.usage.output_tokens * output_price) / 1_000_000
+
+class ModelStats:
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.cost: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.unavailable_until = 0.0
+        self.last_tried = 0.0
+
+    def observe(self, seconds: float, cost: float):
+        self.calls += 1
+        self.latency = seconds if self.latency is None else (1 - EWMA_ALPHA) * self.latency + EWMA_ALPHA * seconds
+        self.cost = cost if self.cost is None else (1 - EWMA_ALPHA) * self.cost + EWMA_ALPHA * cost
+
+class ModelRouter:
+    """
+    Picks the model for each pipeline stage from the routing table. A model stays
+    first choice while its observed latency (EWMA for that stage) is within the
+    stage's latency target and its observed cost within the cost target; otherwise
+    the next one is used. A failed call benches the model for MODEL_FAILURE_COOLDOWN
+    seconds and is retried on the next model, so overloads fall back automatically.
+    """
+
+    def __init__(self, routes: Dict[str, Dict[str, Any]] = None, cooldown: float = MODEL_FAILURE_COOLDOWN):
+        self.routes = routes or load_routes()
+        self.cooldown = cooldown
+        self._stats: Dict[Tuple[str, str], ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, stage: str, model: str) -> ModelStats:
+        key = (stage, model)
+        if key not in self._stats:
+            self._stats[key] = ModelStats()
+        return self._stats[key]
+
+    def candidates(self, stage: str, requested: Optional[str] = None) -> List[str]:
+        route = self.routes[stage]
+        if requested:
+            # Stats are kept per model, so only known models may reach them
+            validate_model(requested)
+        models = list(route["models"]) or ([requested] if requested else [])
+        for model in route.get("fallbacks", []):
+            if model not in models:
+                models.append(model)
+        return models
+
+    def choose(self, stage: str, requested: Optional[str] = None) -> List[str]:
+        """Candidates in the order to try them: models within target first, in table order."""
+        route = self.routes[stage]
+        now = time.monotonic()
+        preferred, demoted, benched = [], [], []
+        with self._lock:
+            for model in self.candidates(stage, requested):
+                stats = self._entry(stage, model)
+                if stats.unavailable_until > now:
+                    benched.append(model)
+                elif (stats.latency or 0.0) > route["latency_target"] or (stats.cost or 0.0) > route["cost_target"]:
+                    if now - stats.last_tried > PROBE_INTERVAL:
+                        stats.last_tried = now
+                        preferred.append(model)
+                    else:
+                        demoted.append(model)
+                else:
+                    preferred.append(model)
+        # Over-target models are still better than nothing; benched ones are a last resort
+        demoted.sort(key=lambda model: self._stats[(stage, model)].latency or 0.0)
+        return preferred + demoted + benched
+
+    def _record(self, stage: str, model: str, seconds: float, cost: float):
+        with self._lock:
+            stats = self._entry(stage, model)
+            stats.observe(seconds, cost)
+            stats.last_tried = time.monotonic()
+
+    def _bench(self, stage: str, model: str, error: Exception):
+        with self._lock:
+            stats = self._entry(stage, model)
+            stats.failures += 1
+            stats.unavailable_until = time.monotonic() + self.cooldown
+        logger.warning(f"Model {model} failed for stage {stage}, falling back for {self.cooldown:.0f}s: {error}")
+
+    async def _run(self, stage: str, requested: Optional[str], call, cost_of):
+        last_error = None
+        for model in self.choose(stage, requested):
+            # Provider time only: waiting in the local rate limiter says nothing about the model
+            timing = {}
+            try:
+                result = await call(model, timing)
+            except Exception as e:
+                # Client errors (a bad request, an unknown model, a moderated image prompt)
+                # would fail on every model, so they are raised instead of benching this one
+                if isinstance(e, HTTPException) and 400 <= e.status_code < 500 and e.status_code != 429:
+                    raise
+                last_error = e
+                self._bench(stage, model, e)
+                continue
+            self._record(stage, model, timing.get("seconds", 0.0), cost_of(model, result))
+            return model, result
+        raise last_error or ValueError(f"No model configured for stage {stage}")
+
+    async def fetch_text(self, stage: str, prompt: str, requested: Optional[str] = None,
+                         priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        """fetch_response through the routing table; returns the Anthropic response."""
+        _, response = await self._run(
+            stage, requested,
+            lambda model, timing: fetch_response(prompt, model, priority, timing=timing, **kwargs),
+            response_cost
+        )
+        return response
+
+    async def fetch_image(self, prompt: str, priority: int = PRIORITY_INTERACTIVE) -> Tuple[bytes, str]:
+        """fetch_image_response through the routing table; returns (image bytes, model used)."""
+        model, image = await self._run(
+            "image", None,
+            lambda model, timing: fetch_image_response(prompt, model, priority, timing),
+            lambda model, _: IMAGE_PRICES.get(model, 0.0)
+        )
+        return image, model
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                stage: {
+                    model: {
+                        "latency_ms": round(stats.latency * 1000) if stats.latency is not None else None,
+                        "cost": round(stats.cost, 5) if stats.cost is not None else None,
+                        "calls": stats.calls,
+                        "failures": stats.failures,
+                        "benched": stats.unavailable_until > time.monotonic(),
+                    }
+                    for (entry_stage, model), stats in self._stats.items() if entry_stage == stage
+                }
+                for stage in self.routes
+            }
+
+model_router = ModelRouter()
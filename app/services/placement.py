@@ -0,0 +1,169 @@
+from typing import List, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+LOGO_MARGIN = 10
+LOGO_CORNERS = ["top-left", "top-right", "bottom-left", "bottom-right"]
+TEXT_POSITIONS = [
+    "top-left", "center-left", "bottom-left",
+    "top-right", "center-right", "bottom-right"
+]
+
+class Box:
+    def __init__(self, x: int, y: int, width: int, height: int):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @property
+    def right(self) -> int:
+        return self.x + self.width
+
+    @property
+    def bottom(self) -> int:
+        return self.y + self.height
+
+    def intersects(self, other: "Box") -> bool:
+        return not (
+            self.right <= other.x or other.right <= self.x
+            or self.bottom <= other.y or other.bottom <= self.y
+        )
+
+    def center(self) -> Tuple[float, float]:
+        return self.x + self.width / 2, self.y + self.height / 2
+
+class TextPlacement(Box):
+    def __init__(self, x: int, y: int, width: int, height: int, side: str, position: str, score: float):
+        super().__init__(x, y, width, height)
+        self.side = side
+        self.position = position
+        self.score = score
+
+class IntegralImage:
+    """
+    Summed-area tables of intensity and intensity², giving O(1) mean/variance for any box.
+    Tables are built on a reduced copy of the image (long side <= max_side); box
+    coordinates are always given in full-resolution pixels.
+    """
+
+    def __init__(self, image_gray: Image.Image, max_side: int = 256):
+        self.width, self.height = image_gray.size
+        self.scale = max(1, max(image_gray.size) // max_side)
+        if self.scale > 1:
+            image_gray = image_gray.reduce(self.scale)
+        pixels = np.asarray(image_gray, dtype=np.int64)
+        rows, cols = pixels.shape
+        self.sum = np.zeros((rows + 1, cols + 1), dtype=np.int64)
+        self.sum_sq = np.zeros((rows + 1, cols + 1), dtype=np.int64)
+        self.sum[1:, 1:] = pixels.cumsum(axis=0).cumsum(axis=1)
+        self.sum_sq[1:, 1:] = (pixels * pixels).cumsum(axis=0).cumsum(axis=1)
+
+    @staticmethod
+    def _box_sum(table, x0, y0, x1, y1):
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    def variance(self, x, y, width, height):
+        """Variance of every box; x and y may be NumPy arrays of box origins."""
+        rows, cols = self.sum.shape[0] - 1, self.sum.shape[1] - 1
+        x0 = np.minimum(np.asarray(x) // self.scale, cols - 1)
+        y0 = np.minimum(np.asarray(y) // self.scale, rows - 1)
+        x1 = np.minimum(x0 + max(width // self.scale, 1), cols)
+        y1 = np.minimum(y0 + max(height // self.scale, 1), rows)
+        area = (x1 - x0) * (y1 - y0)
+        mean = self._box_sum(self.sum, x0, y0, x1, y1) / area
+        mean_sq = self._box_sum(self.sum_sq, x0, y0, x1, y1) / area
+        return np.maximum(mean_sq - mean * mean, 0.0)
+
+def _grid(start: int, stop: int, steps: int) -> np.ndarray:
+    if stop <= start:
+        return np.array([max(start, 0)])
+    return np.unique(np.linspace(start, stop, steps).astype(int))
+
+def _vertical_label(center_y: float, height: int) -> str:
+    if center_y < height / 3:
+        return "top"
+    if center_y < height * 2 / 3:
+        return "center"
+    return "bottom"
+
+def find_text_placement(
+    integral: IntegralImage,
+    box_width: int,
+    box_height: int,
+    grid_steps: int = 24,
+    top_margin: float = 0.05,
+    bottom_margin: float = 0.05
+) -> TextPlacement:
+    """Score a dense grid of candidate text boxes and return the least cluttered one."""
+    width, height = integral.width, integral.height
+    xs = _grid(0, width - box_width, grid_steps // 3)
+    ys = _grid(int(height * top_margin), int(height * (1 - bottom_margin)) - box_height, grid_steps)
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    scores = integral.variance(grid_x, grid_y, box_width, box_height)
+
+    best = np.unravel_index(np.argmin(scores), scores.shape)
+    x, y = int(grid_x[best]), int(grid_y[best])
+    side = "left" if x + box_width / 2 <= width / 2 else "right"
+    position = f"{_vertical_label(y + box_height / 2, height)}-{side}"
+    return TextPlacement(x, y, box_width, box_height, side, position, float(scores[best]))
+
+def fixed_text_placement(integral: IntegralImage, box_width: int, box_height: int, position: str) -> TextPlacement:
+    """Place the text box at one of the named positions instead of searching."""
+    if position not in TEXT_POSITIONS:
+        raise ValueError(f"Position must be one of: {', '.join(TEXT_POSITIONS)}")
+    width, height = integral.width, integral.height
+    vertical, side = position.split("-")
+    x = 0 if side == "left" else width - box_width
+    if vertical == "top":
+        y = int(height * 0.15)
+    elif vertical == "center":
+        y = (height - box_height) // 2
+    else:
+        y = int(height * 0.75)
+    y = min(y, height - box_height)
+    score = float(integral.variance(x, y, box_width, box_height))
+    return TextPlacement(x, y, box_width, box_height, side, position, score)
+
+def logo_box(position: str, image_size: Tuple[int, int], logo_size: Tuple[int, int]) -> Box:
+    """Same corner geometry overlay_logo uses when pasting."""
+    width, height = image_size
+    logo_width, logo_height = logo_size
+    if position == "center":
+        return Box((width - logo_width) // 2, (height - logo_height) // 2, logo_width, logo_height)
+    x = LOGO_MARGIN if position.endswith("left") else width - logo_width - LOGO_MARGIN
+    y = LOGO_MARGIN if position.startswith("top") else height - logo_height - LOGO_MARGIN
+    return Box(x, y, logo_width, logo_height)
+
+def choose_logo_position(
+    text_box: Box,
+    image_size: Tuple[int, int],
+    logo_size: Tuple[int, int],
+    integral: Optional[IntegralImage] = None
+) -> str:
+    """
+    Pick the logo corner that does not overlap the text box, preferring the
+    quietest background and then the corner farthest from the text.
+    """
+    text_cx, text_cy = text_box.center()
+    candidates: List[Tuple[float, float, str]] = []
+    for position in LOGO_CORNERS:
+        box = logo_box(position, image_size, logo_size)
+        if box.intersects(text_box):
+            continue
+        cx, cy = box.center()
+        distance = ((cx - text_cx) ** 2 + (cy - text_cy) ** 2) ** 0.5
+        clutter = 0.0
+        if integral is not None:
+            clutter = float(integral.variance(box.x, box.y, box.width, box.height))
+        candidates.append((clutter, -distance, position))
+
+    if not candidates:
+        # Every corner overlaps the text; take the one farthest from it
+        return max(
+            LOGO_CORNERS,
+            key=lambda p: sum(
+                (a - b) ** 2 for a, b in zip(logo_box(p, image_size, logo_size).center(), (text_cx, text_cy))
+            )
+        )
+    return min(candidates)[2]
@@ -0,0 +1,144 @@
+import asyncio
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import SPECULATIVE_IMAGE
+from app.core.logger import logger
+from app.models.item import Item
+from app.models.output_encoding import OutputEncoding
+from app.services.model_router import model_router
+from app.services.base_image_store import base_image_store
+from app.services.image_decoding import decode_image, ANALYSIS_MAX_SIDE
+from app.services.image_processing import add_text_overlay, extract_color_proportions, generate_random_hex_color
+from app.services.prompt_building import (
+    build_prompt_generation, build_prompt_tagline, build_dynamic_image_prompt, build_speculative_image_prompt,
+    build_prompt_font_selection
+)
+from app.services.rate_limiter import PRIORITY_INTERACTIVE
+from app.services.renditions import render_renditions, upload_renditions
+from app.services.s3 import upload_image_to_s3, BUCKET_NAME
+from app.utils.constants import FONT_LIST
+from app.utils.download_image_from_url import download_image_from_url
+from app.utils.validate_font import get_valid_font
+
+async def generate_base_image(image_prompt_request: str, priority: int = PRIORITY_INTERACTIVE) -> Tuple[bytes, dict]:
+    """Image prompt, Stability base image and its base image store entry: (image bytes, entry)."""
+    image_prompt = (await model_router.fetch_text(
+        "image_prompt", image_prompt_request, None, priority
+    )).content[0].text
+
+    logger.info("Generated image prompt", extra={"image_prompt": image_prompt})
+
+    image, image_model = await model_router.fetch_image(image_prompt, priority)
+    base_image = await base_image_store.put(image, image_prompt, image_model)
+    return image, base_image
+
+def start_speculative_image(purpose: str, style: str, colors: str, business_text: dict,
+                            priority: int = PRIORITY_INTERACTIVE) -> "asyncio.Task":
+    """
+    Start the base image from the purpose/topic, style and brand colours, so the
+    Stability call runs while the post is written instead of after it. The image
+    then follows the brief rather than the finished post text.
+    """
+    image_prompt_request = build_speculative_image_prompt(purpose, style, colors, business_text["category"])
+    return asyncio.create_task(generate_base_image(image_prompt_request, priority))
+
+async def discard_speculative_image(task: Optional["asyncio.Task"]):
+    """Cancel a speculative image whose post failed and consume its result or error."""
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+
+async def generate_single_post(
+    item: Item,
+    business_text: dict,
+    logo: str,
+    encoding: OutputEncoding,
+    rendition_names: List[str] = None,
+    speculative: Optional[bool] = None
+) -> Dict[str, Any]:
+    """
+    Generate one post end to end: post text, tagline, image prompt, base image,
+    font choice, overlay and upload. Shared by the generate-post route and the
+    batch runner; blocking provider calls run in worker threads. With `speculative`
+    (default SPECULATIVE_IMAGE) the base image is generated alongside the post text.
+    """
+    logo_bytes = await download_image_from_url(logo)
+    output_image = await asyncio.to_thread(decode_image, logo_bytes, ANALYSIS_MAX_SIDE)
+
+    color_proportions = await asyncio.to_thread(extract_color_proportions, output_image)
+    colors = ", ".join([ sub['colorCode'] for sub in color_proportions ])
+
+    if speculative is None:
+        speculative = SPECULATIVE_IMAGE
+    image_task = None
+    if speculative:
+        image_task = start_speculative_image(item.purpose, item.style, colors, business_text)
+
+    try:
+        prompt = build_prompt_generation(item, business_text)
+        logger.info("Generating post", extra={"prompt": prompt})
+
+        post = await model_router.fetch_text("post", prompt, item.model)
+
+        tagline_prompt = build_prompt_tagline(item, post.content[0].text)
+        logger.info("Generating tagline", extra={"prompt": tagline_prompt})
+
+        tagline = (await model_router.fetch_text("tagline", tagline_prompt)).content[0].text
+        logger.info("Generated tagline", extra={"tagline": tagline})
+
+        if image_task is None:
+            image_prompt_dynamic = build_dynamic_image_prompt(post.content[0].text, item.style, colors)
+            image, base_image = await generate_base_image(image_prompt_dynamic)
+
+        font_prompt = build_prompt_font_selection(item, tagline, FONT_LIST)
+
+        logger.debug("Selecting font", extra={"prompt": font_prompt})
+
+        model_font = await model_router.fetch_text("font", font_prompt, item.model)
+
+        if image_task is not None:
+            image, base_image = await image_task
+    except BaseException:
+        await discard_speculative_image(image_task)
+        raise
+
+    if not item.style or item.style == "vibrant color theme" or "#" not in item.style:
+        image_style = generate_random_hex_color()
+    else:
+        image_style = item.style.split(",")[0].strip()
+
+    font = get_valid_font(model_font.content[0].text, FONT_LIST)
+
+    logger.info("Selected font", extra={"font": font})
+
+    final_image_bytes = await asyncio.to_thread(
+        add_text_overlay, image, tagline, image_style, font, logo_bytes, encoding, base_image["backdrop_color"]
+    )
+
+    image_id = uuid.uuid4().hex
+    image_name = f"gen_post_{image_id}.{encoding.extension}"
+    await upload_image_to_s3(final_image_bytes, image_name, encoding.content_type)
+    s3_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{image_name}"
+
+    response = {
+        "post": post.content[0].text,
+        "tagline": tagline,
+        "image_url": s3_url,  # Return the S3 URL instead of Base64
+        "base_image_id": base_image["id"],
+        "input_tokens": post.usage.input_tokens,
+        "output_tokens": post.usage.output_tokens,
+    }
+
+    # Extra aspect ratios reuse the same base image: CPU only, no extra model call
+    if rendition_names:
+        rendered = await render_renditions(
+            image, rendition_names, tagline, image_style, font, logo_bytes,
+            encoding, base_image["backdrop_color"]
+        )
+        response["renditions"] = await upload_renditions(rendered, image_id, encoding)
+
+    return response
@@ -0,0 +1,109 @@
+import json
+import re
+from typing import Dict, List, Tuple
+import numpy as np
+from app.core.logger import logger
+
+# Relative value of each interaction when scoring a post
+ENGAGEMENT_WEIGHTS = {
+    "reactions": 1.0,
+    "comments": 3.0,
+    "shares": 4.0,
+    "clicks": 0.5,
+    "linkclicks": 0.5,
+}
+REACH_METRICS = ("impressionsUnique", "impressions")
+DAILY_IMPRESSIONS = ("postsViewedInPeriod", "impressions")
+# Members only per-post metrics carry ("impressions" also names an insights section)
+POST_METRIC_KEYS = tuple(ENGAGEMENT_WEIGHTS) + ("impressionsUnique",)
+_POST_METRIC_MEMBER = re.compile(r'"(?:%s)"\s*:' % "|".join(POST_METRIC_KEYS))
+
+def has_post_metrics(raw) -> bool:
+    """
+    Cheap pre-check on a raw payload: one regex pass with no parsing, so payloads
+    without metrics go straight to the early-stopping text scan. A match inside a
+    string value only costs a full parse that then finds no metrics.
+    """
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode("utf-8")
+    return _POST_METRIC_MEMBER.search(raw) is not None
+
+def _posts_list(payload: dict) -> list:
+    list_of_posts = payload.get("listOfPosts") or {}
+    for section in ("posts", "response"):
+        posts = (list_of_posts.get(section) or {}).get("data")
+        if isinstance(posts, list):
+            return posts
+    return []
+
+def parse_metric_series(section: dict) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Parse an insights section ({"data": [{"metric": ..., "values": [{"dateTime", "value"}]}]})
+    into {metric: (days, values)} arrays, with days as datetime64[D] sorted ascending.
+    """
+    series = {}
+    for entry in (section or {}).get("data") or []:
+        values = entry.get("values") or []
+        if not values:
+            continue
+        # The first 10 characters of dateTime are the local calendar day
+        days = np.array([point.get("dateTime", "")[:10] for point in values], dtype="datetime64[D]")
+        amounts = np.array([point.get("value") or 0 for point in values], dtype=np.float64)
+        order = np.argsort(days)
+        series[entry.get("metric")] = (days[order], amounts[order])
+    return series
+
+def _daily_reach(payload: dict, post_days: np.ndarray) -> np.ndarray:
+    """Share of the page's daily post impressions attributed to each post published that day."""
+    group, name = DAILY_IMPRESSIONS
+    series = parse_metric_series((payload.get(group) or {}).get(name))
+    if not series:
+        return np.zeros(len(post_days))
+    days, values = next(iter(series.values()))
+
+    index = np.clip(np.searchsorted(days, post_days), 0, len(days) - 1)
+    on_day = days[index] == post_days
+    _, inverse, counts = np.unique(post_days, return_inverse=True, return_counts=True)
+    return np.where(on_day, values[index] / counts[inverse], 0.0)
+
+def rank_facebook_posts(data, limit: int = None) -> List[str]:
+    """
+    Return post texts ordered by engagement: weighted interactions first, then reach
+    (falling back to the page's daily impressions on the publishing day), then recency.
+    Returns an empty list when the payload carries no per-post metrics; raw payloads
+    are checked for metric members before being parsed, so the caller can fall back
+    to the early-stopping text scan without a full decode.
+    """
+    try:
+        if isinstance(data, (str, bytes)):
+            if not has_post_metrics(data):
+                return []
+            payload = json.loads(data)
+        else:
+            payload = data
+        posts = [
+            post for post in _posts_list(payload or {})
+            if isinstance(post, dict) and str(post.get("text") or "").strip()
+        ]
+        if not posts or not any(name in post for post in posts for name in POST_METRIC_KEYS):
+            return []
+
+        def column(name):
+            return np.array([post.get(name) or 0 for post in posts], dtype=np.float64)
+
+        weights = np.array(list(ENGAGEMENT_WEIGHTS.values()))
+        interactions = np.column_stack([column(name) for name in ENGAGEMENT_WEIGHTS]) @ weights
+        reach = np.maximum.reduce([column(name) for name in REACH_METRICS])
+        timestamps = column("timestamp")
+        post_days = timestamps.astype("int64").astype("datetime64[ms]").astype("datetime64[D]")
+        reach = np.where(reach > 0, reach, _daily_reach(payload, post_days))
+
+        # lexsort uses the last key as primary; negate for descending order
+        order = np.lexsort((-timestamps, -reach, -interactions))
+        if limit is not None:
+            order = order[:limit]
+        return [str(posts[i]["text"]).strip() for i in order]
+
+    except Exception as e:
+        logger.error(f"Error ranking Facebook posts: {str(e)}")
+        return []
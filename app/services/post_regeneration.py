@@ -0,0 +1,114 @@
+import asyncio
+import json
+from typing import Any, Dict, List
+from app.core.config import REGENERATE_DEADLINE_SECONDS
+from app.core.logger import logger
+from app.models.regeneration_item import RegenerationItem
+from app.services.api_calls import fetch_response, MAX_TOKENS
+from app.services.prompt_budget import shingles, similarity, DUPLICATE_THRESHOLD
+from app.services.prompt_building import build_prompt_regeneration, build_prompt_regeneration_candidates
+
+# Output budget for the structured call grows with n, up to the model's practical limit
+MAX_CANDIDATE_TOKENS = 4096
+
+# Top-up calls still running at the deadline: kept referenced so they finish and their
+# usage is still logged against the request
+_late_calls = set()
+
+def validate_api_response(response) -> None:
+    """Validate the API response structure."""
+    if not response or not response.content or not getattr(response.content[0], "text", None):
+        raise ValueError("Empty response from API")
+    if not response.usage or not hasattr(response.usage, 'input_tokens') or not hasattr(response.usage, 'output_tokens'):
+        raise ValueError("Invalid token usage information in response")
+
+def _account_late_call(call: asyncio.Task):
+    _late_calls.discard(call)
+    if call.cancelled():
+        return
+    if call.exception() is not None:
+        logger.warning(f"Single regeneration failed after the deadline: {call.exception()}")
+        return
+    response = call.result()
+    logger.info("Single regeneration finished after the deadline", extra={
+        "input_tokens": response.usage.input_tokens,
+        "output_tokens": response.usage.output_tokens,
+    })
+
+def parse_candidates(text: str) -> List[str]:
+    """Posts from a {"posts": [...]} answer; tolerates surrounding text and raw newlines in strings."""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return []
+    try:
+        posts = json.loads(text[start:end + 1], strict=False).get("posts", [])
+    except (json.JSONDecodeError, AttributeError) as e:
+        logger.warning(f"Unable to parse regeneration candidates: {e}")
+        return []
+    return [post.strip() for post in posts if isinstance(post, str) and post.strip()]
+
+def distinct(posts: List[str]) -> List[str]:
+    """Drop candidates that are near copies of an earlier one."""
+    kept, kept_shingles = [], []
+    for post in posts:
+        post_shingles = shingles(post)
+        if all(similarity(post_shingles, other) < DUPLICATE_THRESHOLD for other in kept_shingles):
+            kept.append(post)
+            kept_shingles.append(post_shingles)
+    return kept
+
+async def regenerate_candidates(item: RegenerationItem, n: int) -> Dict[str, Any]:
+    """
+    Return up to n distinct rewrites with their combined token usage. n > 1 asks for
+    all versions in one structured call; if that yields too few, the rest come from
+    concurrent single rewrites bounded by REGENERATE_DEADLINE_SECONDS. Rewrites still
+    running at the deadline are left to finish and their usage is logged instead.
+    """
+    usage = {"input_tokens": 0, "output_tokens": 0}
+
+    def add_usage(response):
+        usage["input_tokens"] += response.usage.input_tokens
+        usage["output_tokens"] += response.usage.output_tokens
+
+    if n == 1:
+        response = await fetch_response(build_prompt_regeneration(item), item.model)
+        validate_api_response(response)
+        add_usage(response)
+        return {"posts": [response.content[0].text], **usage}
+
+    response = await fetch_response(
+        build_prompt_regeneration_candidates(item, n), item.model,
+        max_tokens=min(MAX_TOKENS * n, MAX_CANDIDATE_TOKENS)
+    )
+    validate_api_response(response)
+    add_usage(response)
+    posts = distinct(parse_candidates(response.content[0].text))[:n]
+
+    missing = n - len(posts)
+    if missing:
+        logger.info(f"Structured regeneration returned {len(posts)}/{n} distinct posts, topping up {missing}")
+        prompt = build_prompt_regeneration(item)
+        calls = [asyncio.create_task(fetch_response(prompt, item.model)) for _ in range(missing)]
+        done, pending = await asyncio.wait(calls, timeout=REGENERATE_DEADLINE_SECONDS)
+        for call in pending:
+            # Cancelling would not stop the provider call, only lose its usage
+            _late_calls.add(call)
+            call.add_done_callback(_account_late_call)
+        extra = []
+        for call in done:
+            if call.exception() is not None:
+                logger.warning(f"Single regeneration failed: {call.exception()}")
+                continue
+            response = call.result()
+            try:
+                validate_api_response(response)
+            except ValueError as e:
+                logger.warning(f"Single regeneration failed: {e}")
+                continue
+            add_usage(response)
+            extra.append(response.content[0].text)
+        posts = distinct(posts + extra)[:n]
+
+    if not posts:
+        raise ValueError("Empty response from API")
+    return {"posts": posts, **usage}
@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Optional
+from app.core.logger import logger
+
+DEFAULT_HZ = 100
+MAX_SECONDS = 60
+MAX_STORED_PROFILES = 20
+
+class ProfilerBusy(RuntimeError):
+    """Only one sampling session runs at a time."""
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler: a background thread snapshots the stack of every
+    other thread at a fixed rate and counts identical stacks. The output is the
+    collapsed-stack format ("root;caller;callee count" per line) that flamegraph.pl,
+    speedscope and most flamegraph viewers read directly. Threads waiting in a
+    blocking call show up too, which is the point for an I/O-heavy service.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles: "OrderedDict[str, str]" = OrderedDict()
+
+    def _sample(self, stacks: Counter, stop: threading.Event, hz: int, deadline: Optional[float]):
+        own_id = threading.get_ident()
+        names = {}
+        period = 1 / hz
+        while not stop.is_set() and (deadline is None or time.monotonic() < deadline):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_label(frame))
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(frames))] += 1
+            stop.wait(period)
+
+    @staticmethod
+    def collapse(stacks: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def profile_for(self, seconds: float, hz: int = DEFAULT_HZ) -> str:
+        """Sample for `seconds` (blocking the calling thread) and return collapsed stacks."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already being recorded")
+        try:
+            stacks = Counter()
+            self._sample(stacks, threading.Event(), hz, time.monotonic() + min(seconds, MAX_SECONDS))
+            return self.collapse(stacks)
+        finally:
+            self._lock.release()
+
+    def start(self, hz: int = DEFAULT_HZ) -> "ProfileSession":
+        """Start sampling in the background until the returned session is stopped."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already being recorded")
+        return ProfileSession(self, hz)
+
+    def store(self, profile: str) -> str:
+        profile_id = uuid.uuid4().hex
+        self.profiles[profile_id] = profile
+        while len(self.profiles) > MAX_STORED_PROFILES:
+            self.profiles.popitem(last=False)
+        return profile_id
+
+class ProfileSession:
+    def __init__(self, profiler: SamplingProfiler, hz: int):
+        self.profiler = profiler
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        # Cap marked-request sessions the same way as timed ones
+        self._thread = threading.Thread(
+            target=profiler._sample, name="sampling-profiler",
+            args=(self.stacks, self._stop, hz, time.monotonic() + MAX_SECONDS), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        self.profiler._lock.release()
+        profile = SamplingProfiler.collapse(self.stacks)
+        logger.info(f"Recorded profile with {sum(self.stacks.values())} samples")
+        return profile
+
+profiler = SamplingProfiler()
@@ -0,0 +1,81 @@
+import re
+from typing import List, Set, Tuple
+from app.services.rate_limiter import estimate_tokens
+
+# Posts whose word 3-gram sets overlap at least this much are treated as duplicates
+DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+
+_URL = re.compile(r"https?://\S+")
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Hashed word n-grams of the lowercased text; short texts fall back to their words."""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {hash(word) for word in words}
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+def similarity(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def condense_post(text: str, max_tokens: int) -> str:
+    """
+    Shorten a post to roughly max_tokens: drop links, collapse whitespace and keep
+    whole leading sentences, cutting the first one at a word boundary if needed.
+    """
+    text = " ".join(_URL.sub("", text).split())
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    kept = []
+    for sentence in _SENTENCE_END.split(text):
+        if estimate_tokens(" ".join(kept + [sentence])) > max_tokens:
+            break
+        kept.append(sentence)
+    if kept:
+        return " ".join(kept)
+
+    words = []
+    for word in text.split():
+        if estimate_tokens(" ".join(words + [word]) + " ...") > max_tokens:
+            break
+        words.append(word)
+    return " ".join(words) + " ..."
+
+def fit_posts(texts: List[str], token_budget: int, max_post_tokens: int) -> Tuple[List[str], dict]:
+    """
+    Pick reference posts for a prompt within a token budget. Posts are taken in the
+    order given (callers pass the most useful first), condensed, and skipped when
+    they near-duplicate a post already chosen. A post that no longer fits is skipped
+    so shorter ones later in the list can still fill the remaining budget.
+    """
+    selected: List[str] = []
+    selected_shingles: List[Set[int]] = []
+    stats = {"candidates": len(texts), "used": 0, "duplicates": 0, "truncated": 0, "over_budget": 0}
+    remaining = token_budget
+
+    for text in texts:
+        post = condense_post(text, max_post_tokens)
+        if not post:
+            continue
+        post_shingles = shingles(post)
+        if any(similarity(post_shingles, other) >= DUPLICATE_THRESHOLD for other in selected_shingles):
+            stats["duplicates"] += 1
+            continue
+        # Each post is rendered as "Post N: <text>\n"
+        cost = estimate_tokens(f"Post {len(selected) + 1}: {post}\n")
+        if cost > remaining:
+            stats["over_budget"] += 1
+            continue
+        if post != " ".join(text.split()):
+            stats["truncated"] += 1
+        selected.append(post)
+        selected_shingles.append(post_shingles)
+        remaining -= cost
+
+    stats["used"] = len(selected)
+    return selected, stats
@@ -1,5 +1,8 @@
 from app.models.item import Item
 from app.models.regeneration_item import RegenerationItem
+from app.core.config import TOPICS_PROMPT_TOKEN_BUDGET, TOPICS_POST_MAX_TOKENS
+from app.services.prompt_budget import fit_posts
+from app.services.rate_limiter import estimate_tokens
 
 def build_prompt_generation(item: Item, businessText: str) -> str:
     businessCategory = businessText["category"]
@@ -74,6 +77,31 @@ def build_prompt_regeneration(item: RegenerationItem) -> str:
 
     return base_prompt + "Regenerate the post based on this feedback while ensuring it adheres to the original instructions and aligns with the given purpose, and tone. Do not include any introductory or opening or ending or closing text just give me post text that can be directly posted."
 
+def build_prompt_regeneration_candidates(item: RegenerationItem, n: int) -> str:
+    base_prompt = (
+        f"Rewrite and improve the social media post, "
+        f"Here is the previous post:{item.post}, "
+    )
+
+    if item.suggestion:
+        base_prompt += f"Feedback or suggestion for improvement: {item.suggestion}. "
+    else:
+        base_prompt += "Improve the post generally by enhancing creativity, clarity, and engagement. "
+
+    return base_prompt + (
+        f"Write {n} alternative versions of the post based on this feedback while ensuring each adheres to the original instructions and aligns with the given purpose, and tone. "
+        "Make the versions clearly different from each other: vary the opening, the structure and the angle, not just a few words. "
+        "Format the response as a JSON object exactly as shown:\n"
+        "{\n"
+        "  \"posts\": [\n"
+        "    \"First version\",\n"
+        "    \"Second version\"\n"
+        "  ]\n"
+        "}\n\n"
+        "Each version must be post text that can be directly posted. "
+        "Return only the JSON object without any introductory or closing text."
+    )
+
 def build_image_prompt(item: Item, tagline: str) -> str:
     refined_prompt = (
         f"Create a high-quality, professional social media advertisement poster for the following product: "
@@ -142,6 +170,24 @@ def build_dynamic_image_prompt_purpose(post_content: str, style: str, purpose: s
         "Do not include any introductory, opening, ending, or closing text; provide only the prompt needed for generating the advertisement image."
     )
 
+def build_speculative_image_prompt(purpose: str, style: str, colors: str, business_category: str) -> str:
+    # Same brief as build_dynamic_image_prompt, written from the purpose/topic so the
+    # image can be generated before the post text exists
+    return (
+        f"Generate a prompt for a high-quality, visually appealing social media advertisement image. "
+        f"Prompt engineer to perfection. Give the highest weight to the quality. "
+        f"Incorporate these colors with emphasis and weighted importance: {colors}::2, ensuring they influence the mood and aesthetics. "
+        f"Focus on the theme of a post about: '{purpose}' for a business in the category '{business_category}', to ensure the image aligns with the overall message. "
+        f"Use the image style: {style} as the primary palette, ensuring the style dominates the design while remaining harmonious and professional. "
+        "The image must be bold, bright, and well-lit, ensuring clear visibility. "
+        "Specify the layout, composition, and visual elements to create a compelling advertisement image that effectively conveys the message. "
+        "Prompt layout should specify the image prominently, followed by description, and then the theme or colors. "
+        "Describe specific visual elements and composition, emphasizing balance and modern aesthetics. "
+        "Use techniques like quality boosters, weighted terms, style modifiers, and other prompt engineering techniques to ensure optimal output. "
+        "Please keep the generated prompt concise, clear, and as short as possible, with a maximum of 25 to 30 words. Avoid heavy details in the generated prompt. "
+        "Do not include any introductory, opening, ending, or closing text; provide only the prompt needed for generating the advertisement image."
+    )
+
 
 def build_topics_gen_prompt_old(texts, no_of_topics):
     full_text = "Analyze the following content from the user's past posts:\n\n "
@@ -169,7 +215,7 @@ def build_topics_gen_prompt(texts, business_text, no_of_topics):
         "Business Description:\n"
         f"{businessDescription}\n\n"
     )
-    if not texts or len(texts) <= 0:
+    if texts:
         full_text += "Analyze these previous social media posts for style, tone, topics, and themes:\n\n"
         for idx, text in enumerate(texts, 1):
             full_text += f"Post {idx}: {text.strip()}\n"
@@ -213,6 +259,60 @@ def build_topics_gen_prompt(texts, business_text, no_of_topics):
     
     return full_text
 
+def build_topic_replacement_prompt(business_text, existing_topics, no_of_topics):
+    businessCategory = business_text["category"]
+    businessDescription = business_text["description"]
+    full_text = (
+        "You are a highly skilled creative content strategist.\n\n"
+        "Business Category:\n"
+        f"{businessCategory}\n\n"
+        "Business Description:\n"
+        f"{businessDescription}\n\n"
+        "These content topics are already planned:\n"
+    )
+    for idx, topic in enumerate(existing_topics, 1):
+        full_text += f"{idx}. {topic}\n"
+    full_text += (
+        f"\nGenerate {no_of_topics} new topics that cover clearly different angles from every topic above. "
+        "Each topic should be 5-15 words and a clear, specific content idea.\n\n"
+        "Format the response as a JSON object exactly as shown:\n"
+        "{\n"
+        "  'topics': [\n"
+        "    'Specific Topic 1',\n"
+        "    'Specific Topic 2'\n"
+        "  ]\n"
+        "}\n\n"
+        "Do not include any introductory, opening, ending, or closing text. "
+        "Return only the JSON object without any additional text."
+    )
+    return full_text
+
+def assemble_topics_prompt(texts, business_text, no_of_topics, token_budget: int = TOPICS_PROMPT_TOKEN_BUDGET):
+    """
+    Build the topics prompt within a token budget. Reference posts are condensed,
+    de-duplicated and added until the budget is spent. Returns the prompt and a
+    report of estimated tokens with and without budgeting.
+    """
+    texts = [text for text in texts or [] if text and text.strip()]
+    fixed_tokens = estimate_tokens(build_topics_gen_prompt([], business_text, no_of_topics))
+    # The posts section adds its own header and closing sentence on top of the posts
+    section_tokens = estimate_tokens(build_topics_gen_prompt(["x"], business_text, no_of_topics)) - fixed_tokens
+    posts_budget = max(token_budget - fixed_tokens - section_tokens, 0)
+
+    selected, stats = fit_posts(texts, posts_budget, TOPICS_POST_MAX_TOKENS)
+    prompt = build_topics_gen_prompt(selected, business_text, no_of_topics)
+
+    unbudgeted_tokens = estimate_tokens(build_topics_gen_prompt(texts, business_text, no_of_topics))
+    prompt_tokens = estimate_tokens(prompt)
+    report = {
+        **stats,
+        "token_budget": token_budget,
+        "prompt_tokens": prompt_tokens,
+        "unbudgeted_tokens": unbudgeted_tokens,
+        "tokens_saved": max(unbudgeted_tokens - prompt_tokens, 0),
+    }
+    return prompt, report
+
 def build_prompt_bulk_generation(item: Item, businessText: str) -> str:
     businessCategory = businessText["category"]
     businessDescription = businessText["description"]
@@ -0,0 +1,167 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, Tuple
+from app.core.config import (
+    ANTHROPIC_REQUESTS_PER_MINUTE,
+    ANTHROPIC_TOKENS_PER_MINUTE,
+    STABILITY_REQUESTS_PER_MINUTE,
+)
+from app.core.logger import logger
+
+# Lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+PROVIDER_LIMITS = {
+    "anthropic": {
+        "requests_per_minute": ANTHROPIC_REQUESTS_PER_MINUTE,
+        "tokens_per_minute": ANTHROPIC_TOKENS_PER_MINUTE,
+    },
+    "stability": {
+        "requests_per_minute": STABILITY_REQUESTS_PER_MINUTE,
+        "tokens_per_minute": 0,
+    },
+}
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        # Positive amount refunds, negative charges; level may go below zero
+        self.level = min(self.capacity, self.level + amount)
+
+class RateLimiter:
+    """
+    Token-bucket limiter per (provider, model) with requests/min and tokens/min
+    budgets. Waiters for the same bucket are served in priority order, so
+    interactive calls overtake queued bulk work. Waiting is a future on the event
+    loop, woken when the head waiter's budget has refilled, so a throttled call
+    holds neither the loop nor a thread. Use it from the event loop only.
+    """
+
+    def __init__(self, limits: Dict[str, dict]):
+        self.limits = limits
+        self._buckets: Dict[Tuple[str, str], Tuple[TokenBucket, TokenBucket]] = {}
+        self._waiters: Dict[Tuple[str, str], list] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        self._seq = itertools.count()
+
+    def _get_buckets(self, key: Tuple[str, str]):
+        if key not in self._buckets:
+            limits = self.limits[key[0]]
+            requests_bucket = TokenBucket(limits["requests_per_minute"])
+            tokens_bucket = TokenBucket(limits["tokens_per_minute"]) if limits["tokens_per_minute"] else None
+            self._buckets[key] = (requests_bucket, tokens_bucket)
+            self._waiters[key] = []
+        return self._buckets[key]
+
+    def share(self, processes: int):
+        """Give this process 1/processes of every limit, for servers that fork several workers."""
+        self.limits = {
+            provider: {name: max(value // processes, 1) if value else 0 for name, value in limits.items()}
+            for provider, limits in self.limits.items()
+        }
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._buckets.clear()
+        self._waiters.clear()
+
+    def _delay(self, key: Tuple[str, str], tokens: int, now: float) -> float:
+        requests_bucket, tokens_bucket = self._buckets[key]
+        delay = requests_bucket.wait_time(1, now)
+        if tokens_bucket is not None:
+            delay = max(delay, tokens_bucket.wait_time(tokens, now))
+        return delay
+
+    def _consume(self, key: Tuple[str, str], tokens: int):
+        requests_bucket, tokens_bucket = self._buckets[key]
+        requests_bucket.consume(1)
+        if tokens_bucket is not None:
+            tokens_bucket.consume(tokens)
+
+    def _grant(self, key: Tuple[str, str]):
+        """Admit waiters from the head of the queue while the budget allows, then sleep until the next refill."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        waiters = self._waiters.get(key)
+        while waiters:
+            _, _, tokens, future = waiters[0]
+            if future.done():
+                heapq.heappop(waiters)
+                continue
+            delay = self._delay(key, tokens, time.monotonic())
+            if delay > 0:
+                self._timers[key] = asyncio.get_running_loop().call_later(delay, self._grant, key)
+                return
+            heapq.heappop(waiters)
+            self._consume(key, tokens)
+            future.set_result(None)
+
+    async def acquire(self, provider: str, model: str, tokens: int = 0, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Wait until one request (and `tokens` tokens) may be sent to provider/model; returns seconds waited."""
+        key = (provider, model)
+        started = time.monotonic()
+        self._get_buckets(key)
+        waiters = self._waiters[key]
+        if not waiters and self._delay(key, tokens, started) <= 0:
+            self._consume(key, tokens)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(waiters, (priority, next(self._seq), tokens, future))
+        self._grant(key)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller gave up: return the budget
+                self.record_usage(provider, model, tokens, 0, request_refund=True)
+            else:
+                future.cancel()
+                self._grant(key)
+            raise
+
+        waited = time.monotonic() - started
+        if waited > 1:
+            logger.info(f"Rate limiter delayed {provider}/{model} call by {waited:.2f}s (priority {priority})")
+        return waited
+
+    def record_usage(self, provider: str, model: str, estimated_tokens: int, actual_tokens: int,
+                     request_refund: bool = False):
+        """Reconcile the token estimate charged in acquire() with real usage."""
+        key = (provider, model)
+        requests_bucket, tokens_bucket = self._get_buckets(key)
+        if tokens_bucket is not None:
+            tokens_bucket.adjust(estimated_tokens - actual_tokens)
+        if request_refund:
+            requests_bucket.adjust(1)
+        if self._waiters[key]:
+            self._grant(key)
+
+def estimate_tokens(text: str, max_tokens: int = 0) -> int:
+    # Rough local estimate: ~4 characters per token plus the reserved output budget
+    return len(text) // 4 + max_tokens
+
+rate_limiter = RateLimiter(PROVIDER_LIMITS)
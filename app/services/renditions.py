@@ -0,0 +1,122 @@
+import asyncio
+import io
+from typing import Dict, List, Tuple
+import numpy as np
+from PIL import Image, ImageFilter
+from app.core.logger import logger
+from app.models.output_encoding import OutputEncoding
+from app.services.image_processing import add_text_overlay, extract_color_proportions
+from app.services.placement import IntegralImage
+from app.services.s3 import upload_image_to_s3, BUCKET_NAME
+from app.utils.constants import RENDITIONS
+
+# Crop when the target aspect keeps at least this share of the base image, else pad
+MIN_CROP_COVERAGE = 0.6
+CROP_CANDIDATES = 16
+
+def parse_renditions(renditions) -> List[str]:
+    """Accept a comma-separated string or a list of rendition names."""
+    if not renditions:
+        return []
+    if isinstance(renditions, str):
+        renditions = renditions.split(",")
+    names = []
+    for name in renditions:
+        name = str(name).strip().lower()
+        if not name:
+            continue
+        if name not in RENDITIONS:
+            raise ValueError(f"Rendition must be one of: {', '.join(RENDITIONS)}")
+        if name not in names:
+            names.append(name)
+    return names
+
+def _smart_crop(image: Image.Image, crop_width: int, crop_height: int) -> Image.Image:
+    # Keep the most detailed window along the axis being cropped
+    width, height = image.size
+    integral = IntegralImage(image.convert("L"))
+    if crop_width < width:
+        xs = np.unique(np.linspace(0, width - crop_width, CROP_CANDIDATES).astype(int))
+        ys = np.zeros_like(xs)
+    else:
+        ys = np.unique(np.linspace(0, height - crop_height, CROP_CANDIDATES).astype(int))
+        xs = np.zeros_like(ys)
+    best = int(np.argmax(integral.variance(xs, ys, crop_width, crop_height)))
+    x, y = int(xs[best]), int(ys[best])
+    return image.crop((x, y, x + crop_width, y + crop_height))
+
+def _pad(image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    # Fill the frame with a blurred cover-scaled copy, then centre the whole image on it
+    target_width, target_height = size
+    width, height = image.size
+    cover = max(target_width / width, target_height / height)
+    background = image.resize((round(width * cover), round(height * cover)), Image.Resampling.BILINEAR)
+    left = (background.width - target_width) // 2
+    top = (background.height - target_height) // 2
+    background = background.crop((left, top, left + target_width, top + target_height))
+    background = background.filter(ImageFilter.GaussianBlur(radius=max(size) // 40))
+
+    contain = min(target_width / width, target_height / height)
+    foreground = image.resize((round(width * contain), round(height * contain)), Image.Resampling.LANCZOS)
+    background.paste(foreground, ((target_width - foreground.width) // 2, (target_height - foreground.height) // 2))
+    return background
+
+def fit_to_aspect(image: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Smart-crop or pad the base image to the rendition's aspect ratio and size."""
+    target_width, target_height = size
+    width, height = image.size
+    target_ratio = target_width / target_height
+    if abs(width / height - target_ratio) < 0.01:
+        return image.resize(size, Image.Resampling.LANCZOS)
+
+    if width / height > target_ratio:
+        crop_width, crop_height = round(height * target_ratio), height
+    else:
+        crop_width, crop_height = width, round(width / target_ratio)
+
+    if crop_width * crop_height / (width * height) >= MIN_CROP_COVERAGE:
+        return _smart_crop(image, crop_width, crop_height).resize(size, Image.Resampling.LANCZOS)
+    return _pad(image, size)
+
+def _render_rendition(base_image, size, text, bg_color, font_file, logo_bytes, encoding, backdrop_color, text_position):
+    framed = fit_to_aspect(base_image, size)
+    return add_text_overlay(framed, text, bg_color, font_file, logo_bytes, encoding, backdrop_color, text_position)
+
+async def render_renditions(
+    image_bytes: bytes,
+    names: List[str],
+    text: str,
+    bg_color: str,
+    font_file: str,
+    logo_bytes: bytes,
+    encoding: OutputEncoding,
+    backdrop_color: str = None,
+    text_position: str = None
+) -> Dict[str, bytes]:
+    """
+    Render every requested aspect-ratio rendition from one base image in parallel.
+    The backdrop colour is extracted once (unless already known) and shared across renditions.
+    """
+    base_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    base_image.load()
+    if not backdrop_color:
+        backdrop_color = extract_color_proportions(base_image)[0]["colorCode"]
+
+    rendered = await asyncio.gather(*[
+        asyncio.to_thread(
+            _render_rendition, base_image, RENDITIONS[name], text, bg_color,
+            font_file, logo_bytes, encoding, backdrop_color, text_position
+        )
+        for name in names
+    ])
+    return dict(zip(names, rendered))
+
+async def upload_renditions(renditions: Dict[str, bytes], image_id: str, encoding: OutputEncoding) -> Dict[str, str]:
+    """Upload all renditions concurrently and return their S3 URLs by name."""
+    image_names = {name: f"gen_post_{image_id}_{name}.{encoding.extension}" for name in renditions}
+    await asyncio.gather(*[
+        upload_image_to_s3(renditions[name], image_names[name], encoding.content_type)
+        for name in renditions
+    ])
+    logger.info(f"Uploaded {len(renditions)} renditions for {image_id}")
+    return {name: f"https://{BUCKET_NAME}.s3.amazonaws.com/{image_names[name]}" for name in image_names}
@@ -1,22 +1,39 @@
-import aioboto3
 from app.core.logger import logger
 from app.core.config import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION_NAME, BUCKET_NAME
 from fastapi import HTTPException
 
-async def upload_image_to_s3(image, image_name):
-    session = aioboto3.Session(
+def _session():
+    # aioboto3 pulls in botocore (~0.3 s), so it is imported on first upload rather than at startup
+    import aioboto3
+    return aioboto3.Session(
         aws_access_key_id=AWS_ACCESS_KEY_ID,
         aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
         region_name=AWS_REGION_NAME
     )
+
+async def upload_image_to_s3(image, image_name, content_type="image/jpeg"):
+    session = _session()
     async with session.client('s3') as s3_client:
         try:
             await s3_client.put_object(
                 Bucket=BUCKET_NAME,
                 Key=image_name,
                 Body=image,
-                ContentType="image/jpeg"
+                ContentType=content_type
             )
         except Exception as e:
             logger.error(f"Error while uploading image to S3: {e}")
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+
+async def download_from_s3(key):
+    session = _session()
+    async with session.client('s3') as s3_client:
+        try:
+            response = await s3_client.get_object(Bucket=BUCKET_NAME, Key=key)
+            async with response["Body"] as stream:
+                return await stream.read()
+        except s3_client.exceptions.NoSuchKey:
+            raise HTTPException(status_code=404, detail="Object not found")
+        except Exception as e:
+            logger.error(f"Error while downloading {key} from S3: {e}")
             raise HTTPException(status_code=500, detail="Internal Server Error")
\ No newline at end of file
@@ -0,0 +1,64 @@
+from functools import lru_cache
+from itertools import accumulate
+from typing import List, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from app.services.font_registry import font_registry
+
+# Scratch surface for bbox measurements; bbox does not depend on image content
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+
+def get_font(font_file: str, size: int) -> ImageFont.FreeTypeFont:
+    return font_registry.get_font(font_file, size)
+
+def text_bbox(text: str, font: ImageFont.FreeTypeFont, origin: Tuple[int, int] = (0, 0)) -> Tuple[int, int, int, int]:
+    return _MEASURE_DRAW.textbbox(origin, text, font=font)
+
+@lru_cache(maxsize=65536)
+def _word_width(font_name: str, size: int, word: str) -> float:
+    return font_registry.get_font(font_name, size).getlength(word)
+
+def wrap_lines(text: str, font_file: str, size: int, max_width: float) -> List[str]:
+    """
+    Greedy word wrap in linear time. Word widths are cached per (font, size) and
+    line widths come from cumulative sums instead of re-measuring each candidate line.
+    """
+    words = text.split()
+    if not words:
+        return []
+
+    font_name = font_registry.resolve(font_file)
+    space = _word_width(font_name, size, " ")
+    # prefix[i] = width of words[:i] laid out with a trailing space after each word
+    prefix = [0.0, *accumulate(_word_width(font_name, size, word) + space for word in words)]
+
+    lines = []
+    start = 0
+    while start < len(words):
+        end = start + 1
+        while end < len(words) and prefix[end + 1] - prefix[start] - space <= max_width:
+            end += 1
+        lines.append(" ".join(words[start:end]))
+        start = end
+    return lines
+
+def wrap_text(text: str, font_file: str, size: int, max_width: float) -> str:
+    return "\n".join(wrap_lines(text, font_file, size, max_width))
+
+@lru_cache(maxsize=1024)
+def fit_text(text: str, font_file: str, max_width: int, max_height: int) -> Tuple[int, str]:
+    """
+    Find the largest font size whose wrapped text fits inside the box.
+    Returns (font_size, wrapped_text); memoised per (text, font, box).
+    """
+    font_file = font_registry.resolve(font_file)
+    font_size = 1
+    while True:
+        font = get_font(font_file, font_size)
+        wrapped_text = wrap_text(text, font_file, font_size, max_width)
+        text_width, text_height = _MEASURE_DRAW.textbbox((0, 0), wrapped_text, font=font)[2:]
+        if text_width > max_width or text_height > max_height:
+            break
+        font_size += 1
+
+    font_size = max(font_size - 1, 1)
+    return font_size, wrap_text(text, font_file, font_size, max_width)
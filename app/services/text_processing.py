@@ -1,84 +1,158 @@
 import json
+import re
+from json.decoder import scanstring
+from functools import lru_cache
+from typing import Any, Iterator, List
 from app.core.logger import logger
 
-def get_post_facebook(data, limit=None):
-    try:
-        # Handle both string and dict input
-        if isinstance(data, str):
-            try:
-                parsed_data = json.loads(data)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON data: {str(e)}")
-        elif isinstance(data, dict):
-            parsed_data = data
-        else:
-            raise TypeError(f"Expected str or dict, got {type(data)}")
-
-        texts = []
-
-        def recursive_search(data):
-            nonlocal texts
-
-            # Stop if the limit is reached
-            if limit is not None and len(texts) >= limit:
+# Body of a JSON string literal (between the quotes), escapes included
+_JSON_STRING_BODY = r'[^"\\]*(?:\\.[^"\\]*)*'
+_WHITESPACE = re.compile(r'\s*')
+_DECODER = json.JSONDecoder()
+
+# Where LinkedIn exports keep the post objects; only each post's own "comment" is its text
+LINKEDIN_POSTS_PATH = ("payload", "listOfPosts", "response", "data")
+
+@lru_cache(maxsize=16)
+def _member_pattern(key: str) -> re.Pattern:
+    """
+    Regex that skips ahead to the next `"<key>":` member. Other strings are consumed
+    whole (so keys inside string values never match) and everything else is skipped
+    atomically, keeping the scan in the regex engine instead of a Python loop. The
+    atomic run is written as a lookahead plus backreference rather than a possessive
+    quantifier, which needs Python 3.11; the alternatives are otherwise unambiguous,
+    so a document without the key fails in linear time.
+    """
+    quoted = re.escape(key)
+    return re.compile(
+        rf'(?:(?=([^"]+))\1|"(?!{quoted}"){_JSON_STRING_BODY}"|"{quoted}"(?!\s*:))*"{quoted}"\s*:\s*',
+        re.IGNORECASE
+    )
+
+def _iter_raw_members(raw: str, key: str) -> Iterator[str]:
+    """
+    Yield the string value of every `key` member of a raw JSON document, in document
+    order, without parsing the rest of the document. Members whose value is not a
+    string are skipped.
+    """
+    pattern = _member_pattern(key)
+    pos = 0
+    while True:
+        match = pattern.match(raw, pos)
+        if not match:
+            return
+        pos = match.end()
+        if raw.startswith("\"", pos):
+            value, pos = scanstring(raw, pos + 1)
+            yield value
+
+def _iter_raw_array(raw: str, path) -> Iterator[Any]:
+    """
+    Decode the elements of the array reached through the `path` members one at a
+    time, so a consumer that stops early never parses the rest of the document.
+    """
+    pos = 0
+    for key in path:
+        while True:
+            match = _member_pattern(key).match(raw, pos)
+            if not match:
                 return
+            pos = match.end()
+            # A same-named member deeper in the document may come first; the path's
+            # last key must hold an array
+            if key != path[-1] or raw.startswith("[", pos):
+                break
+    pos = _WHITESPACE.match(raw, pos + 1).end()
+    while pos < len(raw) and raw[pos] != "]":
+        value, pos = _DECODER.raw_decode(raw, pos)
+        yield value
+        pos = _WHITESPACE.match(raw, pos).end()
+        if raw.startswith(",", pos):
+            pos = _WHITESPACE.match(raw, pos + 1).end()
 
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    if key.lower() == "text" and value:  # Check if value is not empty
-                        texts.append(str(value).strip())  # Convert to string and strip whitespace
-                        if limit is not None and len(texts) >= limit:
-                            return
-                    else:
-                        recursive_search(value)
+def _iter_object_members(data, key: str) -> Iterator[Any]:
+    """Same values as _iter_raw_members for already-parsed data, walked iteratively."""
+    def members(value):
+        return iter(value.items()) if isinstance(value, dict) else ((None, item) for item in value)
 
-            elif isinstance(data, list):
-                for item in data:
-                    recursive_search(item)
-                    if limit is not None and len(texts) >= limit:
-                        return
+    key = key.lower()
+    stack = [members(data)]
+    while stack:
+        try:
+            name, value = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+        if isinstance(value, (dict, list)):
+            stack.append(members(value))
+        elif isinstance(name, str) and name.lower() == key:
+            yield value
 
-        recursive_search(parsed_data)
-        return texts
+def extract_posts(data, key: str, limit=None) -> List[str]:
+    """
+    Collect the non-empty values of every `key` member (case-insensitive), stopping
+    as soon as `limit` posts are found. Raw JSON payloads are scanned incrementally,
+    so the rest of the document (e.g. insights time series) is never parsed.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    if isinstance(data, str):
+        values = _iter_raw_members(data, key)
+    elif isinstance(data, (dict, list)):
+        values = _iter_object_members(data, key)
+    else:
+        raise TypeError(f"Expected str or dict, got {type(data)}")
 
+    return _collect_posts(values, limit)
+
+def _collect_posts(values, limit=None) -> List[str]:
+    """Non-empty string values, stripped, up to `limit`; numbers, objects and nulls are not posts."""
+    posts = []
+    if limit is not None and limit <= 0:
+        return posts
+    for value in values:
+        if not isinstance(value, str):
+            continue
+        text = value.strip()
+        if text:
+            posts.append(text)
+            if limit is not None and len(posts) >= limit:
+                break
+    return posts
+
+def extract_linkedin_posts(data, limit=None) -> List[str]:
+    """
+    The "comment" of each post object under payload.listOfPosts.response.data.
+    "comment" members nested deeper (e.g. replies) are not posts. Raw JSON is
+    decoded one post at a time and stops at `limit`.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    if isinstance(data, str):
+        posts = _iter_raw_array(data, LINKEDIN_POSTS_PATH)
+    elif isinstance(data, dict):
+        posts = data
+        for key in LINKEDIN_POSTS_PATH:
+            posts = posts.get(key, {}) if isinstance(posts, dict) else {}
+        if not isinstance(posts, list):
+            posts = []
+    else:
+        raise TypeError(f"Expected str or dict, got {type(data)}")
+    return _collect_posts((post.get("comment") for post in posts if isinstance(post, dict)), limit)
+
+def get_post_facebook(data, limit=None):
+    try:
+        return extract_posts(data, "text", limit)
     except Exception as e:
         logger.error(f"Error extracting Facebook posts: {str(e)}")
         return []
 
 def get_posts_linkedIn(data, limit=None):
     try:
-        # Handle both string and dict input
-        if isinstance(data, str):
-            try:
-                data_json = json.loads(data)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON data: {str(e)}")
-        elif isinstance(data, dict):
-            data_json = data
-        else:
-            raise TypeError(f"Expected str or dict, got {type(data)}")
-
-        # Safely navigate the nested structure
-        payload = data_json.get("payload", {})
-        list_of_posts = payload.get("listOfPosts", {})
-        response = list_of_posts.get("response", {})
-        posts_data = response.get("data", [])
-
-        if not posts_data:
+        posts = extract_linkedin_posts(data, limit)
+        if not posts:
             logger.warning("No posts found in LinkedIn data")
-            return []
-
-        # Extract and clean posts
-        posts = []
-        for post in posts_data:
-            if isinstance(post, dict) and "comment" in post:
-                comment = str(post["comment"]).strip()
-                if comment:  # Only add non-empty comments
-                    posts.append(comment)
-                    if limit is not None and len(posts) >= limit:
-                        break
-
-        return posts[:limit] if limit is not None else posts
+        return posts
 
     except Exception as e:
         logger.error(f"Error extracting LinkedIn posts: {str(e)}")
@@ -89,3 +163,70 @@ def get_text_business(data):
         "category": data["category"],
         "description": data["description"],
     }
+
+
+class TopicStreamParser:
+    """
+    Incrementally parses the streamed topics JSON ({"topics": ["...", ...]}).
+    feed() returns each topic as soon as its closing quote arrives, so posts can
+    start before the rest of the list has been generated.
+    """
+
+    def __init__(self):
+        self.state = "seek"
+        self.quote = None
+        self.escaped = False
+        self.current = []
+        self.topics = []
+        self.text = []
+
+    def feed(self, chunk: str) -> list:
+        self.text.append(chunk)
+        completed = []
+        for char in chunk:
+            if self.state == "seek":
+                if char == "[":
+                    self.state = "array"
+            elif self.state == "array":
+                if char in ("\"", "'"):
+                    self.state = "string"
+                    self.quote = char
+                    self.current = []
+                elif char == "]":
+                    self.state = "done"
+            elif self.state == "string":
+                if self.escaped:
+                    self.current.append(char)
+                    self.escaped = False
+                elif char == "\\":
+                    self.current.append(char)
+                    self.escaped = True
+                elif char == self.quote:
+                    topic = self._decode("".join(self.current))
+                    if topic:
+                        self.topics.append(topic)
+                        completed.append(topic)
+                    self.state = "array"
+                else:
+                    self.current.append(char)
+        return completed
+
+    def _decode(self, raw: str) -> str:
+        if self.quote == "'":
+            raw = raw.replace("\\'", "'").replace("\"", "\\\"")
+        try:
+            return json.loads(f"\"{raw}\"").strip()
+        except json.JSONDecodeError:
+            return raw.strip()
+
+    def finish(self) -> list:
+        """Return any topics the incremental pass missed, parsing the full text as JSON."""
+        if self.topics:
+            return []
+        try:
+            topics = json.loads("".join(self.text))["topics"]
+        except Exception as e:
+            logger.error(f"Unable to parse topics response: {str(e)}")
+            return []
+        self.topics = [str(topic).strip() for topic in topics if str(topic).strip()]
+        return list(self.topics)
\ No newline at end of file
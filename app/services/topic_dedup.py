@@ -0,0 +1,54 @@
+import re
+import zlib
+from typing import List, Set
+import numpy as np
+
+# Cosine similarity of hashed character n-gram vectors above which two topics count as the same idea
+TOPIC_SIMILARITY_THRESHOLD = 0.55
+NGRAM_SIZE = 3
+VECTOR_DIMENSIONS = 4096
+# Words from the business description recur in every topic, so they carry little signal
+CONTEXT_WORD_WEIGHT = 0.25
+
+_WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "into", "is",
+    "it", "its", "of", "on", "or", "our", "that", "the", "their", "this", "to", "with", "you", "your",
+}
+
+def content_words(text: str) -> Set[str]:
+    return {word for word in _WORD.findall(text.lower()) if word not in STOPWORDS}
+
+def topic_vector(topic: str, context_words: Set[str] = frozenset()) -> np.ndarray:
+    """
+    L2-normalised vector of hashed character trigrams over the topic's content words.
+    Character n-grams make inflections ("tip"/"tips", "build"/"building") overlap.
+    """
+    words = [word for word in _WORD.findall(topic.lower()) if word not in STOPWORDS]
+    vector = np.zeros(VECTOR_DIMENSIONS, dtype=np.float32)
+    for word in words:
+        weight = CONTEXT_WORD_WEIGHT if word in context_words else 1.0
+        padded = f" {word} "
+        for i in range(max(len(padded) - NGRAM_SIZE + 1, 1)):
+            vector[zlib.crc32(padded[i:i + NGRAM_SIZE].encode("utf-8")) % VECTOR_DIMENSIONS] += weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class TopicDeduplicator:
+    """Accepts topics one at a time and rejects those too similar to one already accepted."""
+
+    def __init__(self, context: str = "", threshold: float = TOPIC_SIMILARITY_THRESHOLD):
+        self.context_words = content_words(context)
+        self.threshold = threshold
+        self.accepted: List[str] = []
+        self.duplicates: List[str] = []
+        self._vectors = np.zeros((0, VECTOR_DIMENSIONS), dtype=np.float32)
+
+    def add(self, topic: str) -> bool:
+        vector = topic_vector(topic, self.context_words)
+        if len(self.accepted) and float((self._vectors @ vector).max()) >= self.threshold:
+            self.duplicates.append(topic)
+            return False
+        self.accepted.append(topic)
+        self._vectors = np.vstack([self._vectors, vector])
+        return True
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from typing import Callable, Dict
+from app.core.logger import logger
+
+WARMUP_ATTEMPTS = 3
+WARMUP_RETRY_DELAY = 5.0
+
+class Warmup:
+    """
+    Loads heavy, lazily imported components in background threads after startup
+    and tracks their state, so /ready only reports a worker once all are warm.
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, Callable[[], object]] = {}
+        self.status: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self.durations: Dict[str, float] = {}
+        self._task = None
+
+    def register(self, name: str, step: Callable[[], object]):
+        self.steps[name] = step
+        self.status[name] = "pending"
+
+    async def _run_step(self, name: str, step: Callable[[], object]):
+        started = time.monotonic()
+        for attempt in range(1, WARMUP_ATTEMPTS + 1):
+            try:
+                await asyncio.to_thread(step)
+                self.status[name] = "ready"
+                self.errors.pop(name, None)
+                break
+            except Exception as e:
+                self.status[name] = "failed"
+                self.errors[name] = str(e)
+                logger.error(f"Warm-up step {name} failed (attempt {attempt}/{WARMUP_ATTEMPTS}): {e}")
+                if attempt < WARMUP_ATTEMPTS:
+                    await asyncio.sleep(WARMUP_RETRY_DELAY * attempt)
+        self.durations[name] = round(time.monotonic() - started, 3)
+
+    async def run(self):
+        await asyncio.gather(*[self._run_step(name, step) for name, step in self.steps.items()])
+        logger.info("Warm-up finished", extra={"status": self.status, "durations": self.durations})
+
+    def start(self):
+        """Schedule the warm-up on the running loop without blocking startup."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    @property
+    def ready(self) -> bool:
+        return all(state == "ready" for state in self.status.values())
+
+    def report(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "warming",
+            "components": dict(self.status),
+            "durations": dict(self.durations),
+            "errors": dict(self.errors),
+        }
+
+def _import_image_libraries():
+    import extcolors  # noqa: F401
+
+def _import_storage_libraries():
+    import aioboto3  # noqa: F401
+
+def _default_warmup() -> Warmup:
+    from app.services.api_calls import get_client
+    from app.services.image_processing import get_rembg_session
+
+    # Fonts are not a step here: main.py loads them synchronously so a bad font fails boot
+    warmup = Warmup()
+    warmup.register("rembg", get_rembg_session)
+    warmup.register("extcolors", _import_image_libraries)
+    warmup.register("anthropic", get_client)
+    warmup.register("s3", _import_storage_libraries)
+    return warmup
+
+warmup = _default_warmup()
@@ -1,33 +1,99 @@
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect
 from typing import Dict, List
 import json
 
+try:
+    import msgpack
+except ImportError:  # MessagePack framing is optional; clients fall back to JSON text
+    msgpack = None
+
+# Sec-WebSocket-Protocol values a client can offer to pick the framing of every message
+SUBPROTOCOL_MSGPACK = "bulk.msgpack"
+SUBPROTOCOL_JSON = "bulk.json"
+
 class ConnectionManager:
+    """
+    Bulk websocket connections and their framing. A client that offers the
+    bulk.msgpack subprotocol (and a server with msgpack installed) gets binary
+    MessagePack frames and may send them; everyone else gets JSON text frames.
+    permessage-deflate is negotiated by the server (WS_PER_MESSAGE_DEFLATE) and
+    applies to both.
+    """
+
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self.encodings: Dict[str, str] = {}
 
     async def connect(self, websocket: WebSocket, client_id: str):
-        await websocket.accept()
+        offered = websocket.scope.get("subprotocols", [])
+        if SUBPROTOCOL_MSGPACK in offered and msgpack is not None:
+            subprotocol, encoding = SUBPROTOCOL_MSGPACK, "msgpack"
+        else:
+            subprotocol, encoding = (SUBPROTOCOL_JSON if SUBPROTOCOL_JSON in offered else None), "json"
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections[client_id] = websocket
+        self.encodings[client_id] = encoding
 
     def disconnect(self, client_id: str):
         self.active_connections.pop(client_id, None)
+        self.encodings.pop(client_id, None)
+
+    async def receive(self, client_id: str) -> dict:
+        """Next message from the client: JSON text or, on msgpack connections, a MessagePack binary frame."""
+        message = await self.active_connections[client_id].receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("bytes") is not None:
+            if self.encodings.get(client_id) != "msgpack":
+                raise ValueError("Binary messages need the bulk.msgpack subprotocol")
+            try:
+                data = msgpack.unpackb(message["bytes"])
+            except Exception as e:
+                raise ValueError(f"Invalid MessagePack format: {str(e)}")
+        else:
+            try:
+                data = json.loads(message["text"])
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON format: {str(e)}")
+        if not isinstance(data, dict):
+            raise ValueError("Message must be an object")
+        return data
+
+    async def send(self, client_id: str, message: dict):
+        if client_id not in self.active_connections:
+            return
+        websocket = self.active_connections[client_id]
+        if self.encodings.get(client_id) == "msgpack":
+            await websocket.send_bytes(msgpack.packb(message, use_bin_type=True))
+        else:
+            await websocket.send_text(json.dumps(message))
 
     async def send_progress(self, client_id: str, current: int, total: int, post_data: dict = None):
-        if client_id in self.active_connections:
-            message = {
-                "type": "progress",
-                "current": current,
-                "total": total,
-                "post_data": post_data
-            }
-            await self.active_connections[client_id].send_text(json.dumps(message))
+        await self.send(client_id, {
+            "type": "progress",
+            "current": current,
+            "total": total,
+            "post_data": post_data
+        })
+
+    async def send_complete(self, client_id: str, posts: List[dict], delivered: List[int],
+                            by_reference: bool = False, **extra):
+        """
+        Final message of a job. With `by_reference` the posts already sent in progress
+        messages are listed by their `current` number instead of being sent again.
+        """
+        message = {"type": "complete"}
+        if by_reference:
+            message["delivered"] = delivered
+        else:
+            message["posts"] = posts
+        message.update(extra)
+        await self.send(client_id, message)
 
     async def send_error(self, client_id: str, error: str):
-        if client_id in self.active_connections:
-            await self.active_connections[client_id].send_text(json.dumps({
-                "type": "error",
-                "message": error
-            }))
+        await self.send(client_id, {
+            "type": "error",
+            "message": error
+        })
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
@@ -1 +1,15 @@
-FONT_LIST = ['AbrilFatface-Regular.ttf', 'AmaticSC-Regular.ttf', 'Bangers-Regular.ttf', 'Fredoka-Bold.ttf', 'Fredoka-Medium.ttf', 'Fredoka-SemiBold.ttf', 'Fredoka_Condensed-Bold.ttf', 'Fredoka_Condensed-Medium.ttf', 'Fredoka_Condensed-SemiBold.ttf', 'Fredoka_Expanded-Bold.ttf', 'Fredoka_Expanded-Medium.ttf', 'Fredoka_Expanded-SemiBold.ttf', 'Fredoka_SemiCondensed-Medium.ttf', 'Fredoka_SemiCondensed-SemiBold.ttf', 'Fredoka_SemiExpanded-Bold.ttf', 'Fredoka_SemiExpanded-Medium.ttf', 'Fredoka_SemiExpanded-SemiBold.ttf', 'JosefinSans-Bold.ttf', 'JosefinSans-BoldItalic.ttf', 'JosefinSans-Italic.ttf', 'JosefinSans-Medium.ttf', 'JosefinSans-MediumItalic.ttf', 'JosefinSans-SemiBold.ttf', 'JosefinSans-SemiBoldItalic.ttf', 'Lora-Bold.ttf', 'Lora-BoldItalic.ttf', 'Lora-Italic.ttf', 'Lora-Medium.ttf', 'Lora-MediumItalic.ttf', 'Lora-SemiBold.ttf', 'Lora-SemiBoldItalic.ttf', 'Merriweather-Bold.ttf', 'Merriweather-BoldItalic.ttf', 'Merriweather-Italic.ttf', 'Montserrat-Bold.ttf', 'Montserrat-BoldItalic.ttf', 'Montserrat-ExtraBold.ttf', 'Montserrat-ExtraBoldItalic.ttf', 'Montserrat-Italic.ttf', 'Montserrat-Medium.ttf', 'Montserrat-MediumItalic.ttf', 'Montserrat-SemiBold.ttf', 'Montserrat-SemiBoldItalic.ttf', 'NotoSans-Bold.ttf', 'NotoSans-BoldItalic.ttf', 'NotoSans-Medium.ttf', 'NotoSans-MediumItalic.ttf', 'NotoSans-SemiBold.ttf', 'NotoSans-SemiBoldItalic.ttf', 'NotoSans_Condensed-Bold.ttf', 'NotoSans_Condensed-BoldItalic.ttf', 'NotoSans_Condensed-Italic.ttf', 'NotoSans_Condensed-Medium.ttf', 'NotoSans_Condensed-MediumItalic.ttf', 'NotoSans_Condensed-SemiBold.ttf', 'NotoSans_Condensed-SemiBoldItalic.ttf', 'NotoSans_ExtraCondensed-Bold.ttf', 'NotoSans_ExtraCondensed-BoldItalic.ttf', 'NotoSans_ExtraCondensed-ExtraBold.ttf', 'NotoSans_ExtraCondensed-ExtraBoldItalic.ttf', 'NotoSans_ExtraCondensed-Italic.ttf', 'NotoSans_ExtraCondensed-Medium.ttf', 'NotoSans_ExtraCondensed-MediumItalic.ttf', 'NotoSans_ExtraCondensed-SemiBold.ttf', 'NotoSans_ExtraCondensed-SemiBoldItalic.ttf', 'NotoSans_SemiCondensed-Bold.ttf', 'NotoSans_SemiCondensed-BoldItalic.ttf', 'NotoSans_SemiCondensed-Medium.ttf', 'NotoSans_SemiCondensed-MediumItalic.ttf', 'NotoSans_SemiCondensed-SemiBold.ttf', 'NotoSans_SemiCondensed-SemiBoldItalic.ttf', 'Oswald-Bold.ttf', 'Oswald-Medium.ttf', 'Oswald-SemiBold.ttf', 'PlayfairDisplay-Bold.ttf', 'PlayfairDisplay-BoldItalic.ttf', 'PlayfairDisplay-Medium.ttf', 'PlayfairDisplay-MediumItalic.ttf', 'PlayfairDisplay-SemiBold.ttf', 'PlayfairDisplay-SemiBoldItalic.ttf', 'Raleway-Bold.ttf', 'Raleway-BoldItalic.ttf', 'Raleway-Medium.ttf', 'Raleway-MediumItalic.ttf', 'Raleway-SemiBold.ttf', 'Raleway-SemiBoldItalic.ttf', 'Roboto-Bold.ttf', 'Roboto-BoldItalic.ttf', 'Roboto-SemiBold.ttf', 'Roboto-SemiBoldItalic.ttf', 'Roboto_Condensed-Bold.ttf', 'Roboto_Condensed-Italic.ttf', 'Roboto_Condensed-Medium.ttf']
\ No newline at end of file
+FONT_LIST = ['AbrilFatface-Regular.ttf', 'AmaticSC-Regular.ttf', 'Bangers-Regular.ttf', 'Fredoka-Bold.ttf', 'Fredoka-Medium.ttf', 'Fredoka-SemiBold.ttf', 'Fredoka_Condensed-Bold.ttf', 'Fredoka_Condensed-Medium.ttf', 'Fredoka_Condensed-SemiBold.ttf', 'Fredoka_Expanded-Bold.ttf', 'Fredoka_Expanded-Medium.ttf', 'Fredoka_Expanded-SemiBold.ttf', 'Fredoka_SemiCondensed-Medium.ttf', 'Fredoka_SemiCondensed-SemiBold.ttf', 'Fredoka_SemiExpanded-Bold.ttf', 'Fredoka_SemiExpanded-Medium.ttf', 'Fredoka_SemiExpanded-SemiBold.ttf', 'JosefinSans-Bold.ttf', 'JosefinSans-BoldItalic.ttf', 'JosefinSans-Italic.ttf', 'JosefinSans-Medium.ttf', 'JosefinSans-MediumItalic.ttf', 'JosefinSans-SemiBold.ttf', 'JosefinSans-SemiBoldItalic.ttf', 'Lora-Bold.ttf', 'Lora-BoldItalic.ttf', 'Lora-Italic.ttf', 'Lora-Medium.ttf', 'Lora-MediumItalic.ttf', 'Lora-SemiBold.ttf', 'Lora-SemiBoldItalic.ttf', 'Merriweather-Bold.ttf', 'Merriweather-BoldItalic.ttf', 'Merriweather-Italic.ttf', 'Montserrat-Bold.ttf', 'Montserrat-BoldItalic.ttf', 'Montserrat-ExtraBold.ttf', 'Montserrat-ExtraBoldItalic.ttf', 'Montserrat-Italic.ttf', 'Montserrat-Medium.ttf', 'Montserrat-MediumItalic.ttf', 'Montserrat-SemiBold.ttf', 'Montserrat-SemiBoldItalic.ttf', 'NotoSans-Bold.ttf', 'NotoSans-BoldItalic.ttf', 'NotoSans-Medium.ttf', 'NotoSans-MediumItalic.ttf', 'NotoSans-SemiBold.ttf', 'NotoSans-SemiBoldItalic.ttf', 'NotoSans_Condensed-Bold.ttf', 'NotoSans_Condensed-BoldItalic.ttf', 'NotoSans_Condensed-Italic.ttf', 'NotoSans_Condensed-Medium.ttf', 'NotoSans_Condensed-MediumItalic.ttf', 'NotoSans_Condensed-SemiBold.ttf', 'NotoSans_Condensed-SemiBoldItalic.ttf', 'NotoSans_ExtraCondensed-Bold.ttf', 'NotoSans_ExtraCondensed-BoldItalic.ttf', 'NotoSans_ExtraCondensed-ExtraBold.ttf', 'NotoSans_ExtraCondensed-ExtraBoldItalic.ttf', 'NotoSans_ExtraCondensed-Italic.ttf', 'NotoSans_ExtraCondensed-Medium.ttf', 'NotoSans_ExtraCondensed-MediumItalic.ttf', 'NotoSans_ExtraCondensed-SemiBold.ttf', 'NotoSans_ExtraCondensed-SemiBoldItalic.ttf', 'NotoSans_SemiCondensed-Bold.ttf', 'NotoSans_SemiCondensed-BoldItalic.ttf', 'NotoSans_SemiCondensed-Medium.ttf', 'NotoSans_SemiCondensed-MediumItalic.ttf', 'NotoSans_SemiCondensed-SemiBold.ttf', 'NotoSans_SemiCondensed-SemiBoldItalic.ttf', 'Oswald-Bold.ttf', 'Oswald-Medium.ttf', 'Oswald-SemiBold.ttf', 'PlayfairDisplay-Bold.ttf', 'PlayfairDisplay-BoldItalic.ttf', 'PlayfairDisplay-Medium.ttf', 'PlayfairDisplay-MediumItalic.ttf', 'PlayfairDisplay-SemiBold.ttf', 'PlayfairDisplay-SemiBoldItalic.ttf', 'Raleway-Bold.ttf', 'Raleway-BoldItalic.ttf', 'Raleway-Medium.ttf', 'Raleway-MediumItalic.ttf', 'Raleway-SemiBold.ttf', 'Raleway-SemiBoldItalic.ttf', 'Roboto-Bold.ttf', 'Roboto-BoldItalic.ttf', 'Roboto-SemiBold.ttf', 'Roboto-SemiBoldItalic.ttf', 'Roboto_Condensed-Bold.ttf', 'Roboto_Condensed-Italic.ttf', 'Roboto_Condensed-Medium.ttf']
+
+OUTPUT_FORMATS = {
+    "jpeg": {"pil_format": "JPEG", "content_type": "image/jpeg", "extension": "jpeg"},
+    "webp": {"pil_format": "WEBP", "content_type": "image/webp", "extension": "webp"},
+    "png": {"pil_format": "PNG", "content_type": "image/png", "extension": "png"},
+}
+
+# Output sizes per publishing format (width, height)
+RENDITIONS = {
+    "square": (1080, 1080),
+    "portrait": (1080, 1350),
+    "landscape": (1200, 627),
+    "story": (1080, 1920),
+}
\ No newline at end of file
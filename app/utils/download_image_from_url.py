@@ -2,8 +2,13 @@ import requests
 from app.core.logger import logger
 from fastapi import HTTPException
 import httpx
+from app.services.single_flight import single_flight, normalise_url
 
 async def download_image_from_url(logo_url: str) -> bytes:
+    # Concurrent requests for the same logo (bulk job, interactive call, second tab) share one download
+    return await single_flight.do_async(("download", normalise_url(logo_url)), lambda: _download(logo_url))
+
+async def _download(logo_url: str) -> bytes:
     try:
         async with httpx.AsyncClient() as client:
             response = await client.get(logo_url)
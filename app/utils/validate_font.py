@@ -1,6 +1,8 @@
+from app.services.font_registry import font_registry, FONTS_DIR, DEFAULT_FONT
+
 def get_valid_font(font: str, font_list: list) -> str:
     response = font.strip()
-    if response in font_list:
-        return './fonts/' + response
+    if response in font_list and font_registry.has(response):
+        return f"{FONTS_DIR}/{response}"
     else:
-        return './fonts/Roboto-Regular.ttf'
+        return f"{FONTS_DIR}/{DEFAULT_FONT}"
\ No newline at end of file
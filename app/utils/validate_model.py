@@ -0,0 +1,6 @@
+from app.core.config import SUPPORTED_MODELS
+
+def validate_model(model: str) -> str:
+    if model not in SUPPORTED_MODELS:
+        raise ValueError(f"Unsupported model. Must be one of: {', '.join(SUPPORTED_MODELS)}")
+    return model
@@ -0,0 +1,201 @@
+"""
+Offline bulk generation: run a JSONL file of generate-post requests through the
+same service layer as the API and append one result per line to an output JSONL.
+
+    python batch_generate.py campaign.jsonl -o campaign.out.jsonl --concurrency 4
+
+Each input line takes the generate-post fields (bzname, purpose, preferredTone,
+style, businessDescription, logo, ...) plus an optional "id". Re-running with the
+same output file skips requests that already succeeded, so a crashed run resumes
+where it stopped; failed requests are retried.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+from typing import Any, Dict, List, Set, Tuple
+
+from pydantic import ValidationError
+
+from app.core.logger import logger
+from app.models.item import Item
+from app.models.output_encoding import OutputEncoding
+from app.services.base_image_store import base_image_store
+from app.services.font_registry import font_registry
+from app.services.post_generation import generate_single_post
+from app.services.renditions import parse_renditions
+from app.services.text_processing import get_text_business
+
+def read_requests(path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    requests = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON: {e}")
+            request_id = str(request.get("id") or request.get("request_id") or f"line-{line_number}")
+            requests.append((request_id, request))
+    return requests
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids already written with status ok; a torn last line from a crash is ignored."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(str(record.get("id")))
+    return done
+
+class ResultWriter:
+    """Appends one JSON record per line and fsyncs it, so finished work survives a crash."""
+
+    def __init__(self, path: str):
+        self.file = open(path, "a+")
+        self.file.seek(0, os.SEEK_END)
+        if self.file.tell() > 0:
+            self.file.seek(self.file.tell() - 1)
+            if self.file.read(1) != "\n":
+                self.file.write("\n")
+
+    def write(self, record: dict):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+class Stats:
+    def __init__(self, total: int):
+        self.total = total
+        self.ok = 0
+        self.failed = 0
+        self.latencies: List[float] = []
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.started = time.monotonic()
+
+    def record(self, ok: bool, elapsed: float, result: dict = None):
+        self.latencies.append(elapsed)
+        if ok:
+            self.ok += 1
+            self.input_tokens += result.get("input_tokens", 0)
+            self.output_tokens += result.get("output_tokens", 0)
+        else:
+            self.failed += 1
+
+    def line(self) -> str:
+        done = self.ok + self.failed
+        wall = time.monotonic() - self.started
+        rate = done / wall * 60 if wall else 0.0
+        return f"[{done}/{self.total}] ok={self.ok} failed={self.failed} {rate:.1f} posts/min"
+
+    def summary(self) -> str:
+        wall = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] if latencies else 0.0
+
+        return (
+            f"{self.ok + self.failed} requests in {wall:.1f}s "
+            f"({self.ok} ok, {self.failed} failed, {self.ok / wall * 60 if wall else 0:.1f} posts/min); "
+            f"latency p50={percentile(0.5):.1f}s p95={percentile(0.95):.1f}s; "
+            f"tokens in={self.input_tokens} out={self.output_tokens}"
+        )
+
+async def run_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    item = Item(
+        length=request.get("length", 150),
+        bzname=request.get("bzname", ""),
+        purpose=request.get("purpose", ""),
+        preferredTone=request.get("preferredTone", ""),
+        website=request.get("website", ""),
+        hashtags=request.get("hashtags", False),
+        style=request.get("style") or "digital",
+        model=request.get("model", "claude-3-5-haiku-20241022")
+    )
+    encoding = OutputEncoding(
+        output_format=request.get("output_format", "jpeg"),
+        quality=request.get("quality", 85),
+        target_bytes=request.get("target_bytes")
+    )
+    rendition_names = parse_renditions(request.get("renditions"))
+    business_description = request.get("businessDescription", {})
+    if isinstance(business_description, str):
+        business_description = json.loads(business_description)
+    business_text = get_text_business(business_description)
+    return await generate_single_post(
+        item, business_text, request["logo"], encoding, rendition_names, request.get("speculative_image")
+    )
+
+async def run_batch(input_path: str, output_path: str, concurrency: int) -> Stats:
+    requests = read_requests(input_path)
+    done = completed_ids(output_path)
+    pending = [(request_id, request) for request_id, request in requests if request_id not in done]
+    print(f"{len(requests)} requests, {len(requests) - len(pending)} already done, {len(pending)} to run", file=sys.stderr)
+
+    font_registry.load()
+    stats = Stats(len(pending))
+    writer = ResultWriter(output_path)
+    queue: asyncio.Queue = asyncio.Queue()
+    for entry in pending:
+        queue.put_nowait(entry)
+
+    async def worker():
+        while True:
+            try:
+                request_id, request = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.monotonic()
+            try:
+                result = await run_request(request)
+                elapsed = time.monotonic() - started
+                writer.write({"id": request_id, "status": "ok", "elapsed": round(elapsed, 2), "result": result})
+                stats.record(True, elapsed, result)
+            except (ValidationError, ValueError, KeyError) as e:
+                elapsed = time.monotonic() - started
+                writer.write({"id": request_id, "status": "error", "elapsed": round(elapsed, 2), "error": f"Invalid request: {e}"})
+                stats.record(False, elapsed)
+            except Exception as e:
+                elapsed = time.monotonic() - started
+                logger.error(f"Batch request {request_id} failed: {traceback.format_exc()}")
+                writer.write({"id": request_id, "status": "error", "elapsed": round(elapsed, 2), "error": str(e)})
+                stats.record(False, elapsed)
+            print(stats.line(), file=sys.stderr)
+
+    try:
+        await asyncio.gather(*[worker() for _ in range(max(concurrency, 1))])
+        await base_image_store.drain()
+    finally:
+        writer.close()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate posts from a JSONL file of requests.")
+    parser.add_argument("input", help="JSONL file with one generate-post request per line")
+    parser.add_argument("-o", "--output", help="Output JSONL (default: <input>.out.jsonl)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Requests in flight at once")
+    args = parser.parse_args()
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}.out.jsonl"
+    stats = asyncio.run(run_batch(args.input, output, args.concurrency))
+    print(stats.summary(), file=sys.stderr)
+    sys.exit(1 if stats.failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,33 @@
 # # No Third person except AI-Team is allowed to run this code. No changes in this code are allowed except by approval from AI Team
 # # Moderation API will be implemented once This application will be in production.
 
-from fastapi import FastAPI
+import re
+import uuid
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import generate_post, process_image, regenerate_image, bulk_post_generation, regenerate_post, test, websocket_health
+from app.routes import generate_post, process_image, regenerate_image, bulk_post_generation, regenerate_post, rerender_image, test, websocket_health, readiness, admin
+from app.core.logger import request_id_var
+from app.services.font_registry import font_registry
+from app.services.warmup import warmup
+from app.services.loop_monitor import loop_watchdog
 
 app = FastAPI()
 
+REQUEST_ID_PATTERN = re.compile(r"^[\w.-]{1,128}$")
+
+@app.on_event("startup")
+async def start_warmup():
+    # Fail at boot rather than at render time if fonts are missing or invalid (cheap,
+    # and already done before forking under serve.py)
+    font_registry.load()
+    # The rembg model and the SDKs load in the background; /ready reports when they are done
+    warmup.start()
+    loop_watchdog.start()
+
+@app.on_event("shutdown")
+async def stop_watchdog():
+    loop_watchdog.stop()
+
 origins = ["*"] 
 app.add_middleware(
     CORSMiddleware,
@@ -15,11 +36,29 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.middleware("http")(admin.profile_marked_requests)
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    # Every log record written while the request runs carries this id; callers may supply their own
+    request_id = request.headers.get("X-Request-ID", "")
+    if not REQUEST_ID_PATTERN.match(request_id):
+        request_id = str(uuid.uuid4())
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 app.include_router(generate_post.router, prefix="/api", tags=["Generate Post"])
 app.include_router(regenerate_image.router, prefix="/api", tags=["Regenerate Image"])
 app.include_router(regenerate_post.router, prefix="/api", tags=["Regenerate Post"])
+app.include_router(rerender_image.router, prefix="/api", tags=["Rerender Image"])
 app.include_router(process_image.router, prefix="/api", tags=["Process Image"])
 app.include_router(bulk_post_generation.router, prefix="/api", tags=["Bulk Post Generation"])
 app.include_router(websocket_health.router, prefix="/api", tags=["Websocket Health"])
+app.include_router(readiness.router, tags=["Readiness"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 app.include_router(test.router, prefix="/test", tags=["Test"])
\ No newline at end of file
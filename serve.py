@@ -0,0 +1,187 @@
+"""
+Production server: load read-only assets (rembg model, fonts, heavy modules) once
+in a master process, then fork workers that share those pages copy-on-write.
+
+    python serve.py --host 0.0.0.0 --port 8000 [--workers N]
+
+The master keeps the listening socket, restarts workers that die and periodically
+logs per-worker memory (RSS, PSS and private), which shows how much is shared.
+"""
+import os
+
+# ONNX Runtime thread pools do not survive fork; parallelism comes from worker processes
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+import argparse
+import gc
+import signal
+import socket
+import time
+from typing import Dict, Optional
+
+import uvicorn
+
+from app.core.config import WEB_WORKERS, WORKER_MEMORY_MB, MEMORY_REPORT_INTERVAL, WS_PER_MESSAGE_DEFLATE
+from app.core.logger import logger, flush_logs
+
+def available_memory_mb() -> Optional[int]:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+def process_memory_mb(pid: int) -> Dict[str, float]:
+    """RSS, PSS (shared pages split between sharers) and private memory of a process."""
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    memory[name] = int(rest.split()[0]) / 1024
+    except OSError:
+        return memory
+    return {
+        "rss": round(memory.get("Rss", 0), 1),
+        "pss": round(memory.get("Pss", 0), 1),
+        "private": round(memory.get("Private_Clean", 0) + memory.get("Private_Dirty", 0), 1),
+    }
+
+def auto_workers(worker_memory_mb: int) -> int:
+    """One worker per usable core, capped by how many fit in available memory."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    memory = available_memory_mb()
+    by_memory = memory // worker_memory_mb if memory else cores
+    return max(1, min(cores, by_memory))
+
+def preload():
+    """Import the app and load shared read-only state before any worker is forked."""
+    import main
+    from app.services.font_registry import font_registry
+    from app.services.image_processing import get_rembg_session
+
+    font_registry.load()
+    try:
+        get_rembg_session()
+    except Exception as e:
+        # Workers retry through their own warm-up; they just will not share the model
+        logger.error(f"Could not preload the rembg model: {e}")
+
+    # Import only: API clients hold sockets and thread pools, so each worker creates its own
+    import aioboto3  # noqa: F401
+    import anthropic  # noqa: F401
+    import extcolors  # noqa: F401
+
+    # Move everything loaded so far out of the collector's reach so GC passes in
+    # the workers do not write to (and un-share) these pages
+    gc.collect()
+    gc.freeze()
+    return main.app
+
+class Master:
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str, report_interval: int):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.report_interval = report_interval
+        self.children: Dict[int, int] = {}
+        self.stopping = False
+
+    def _run_worker(self, slot: int):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        from app.services.rate_limiter import rate_limiter
+        rate_limiter.share(self.workers)
+
+        config = uvicorn.Config(self.app, log_level=self.log_level, ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE)
+        server = uvicorn.Server(config)
+        logger.info(f"Worker {slot} started", extra={"pid": os.getpid()})
+        server.run(sockets=[self.sock])
+
+    def spawn(self, slot: int):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker(slot)
+            except BaseException:
+                exit_code = 1
+            finally:
+                flush_logs()
+                os._exit(exit_code)
+        self.children[pid] = slot
+
+    def _signal(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report_memory(self):
+        report = {"master": process_memory_mb(os.getpid())}
+        for pid, slot in sorted(self.children.items(), key=lambda child: child[1]):
+            report[f"worker-{slot}"] = {"pid": pid, **process_memory_mb(pid)}
+        total_pss = sum(entry.get("pss", 0) for entry in report.values())
+        summary = "; ".join(
+            f"{name} rss={entry.get('rss', 0)} pss={entry.get('pss', 0)} private={entry.get('private', 0)}"
+            for name, entry in report.items()
+        )
+        logger.info(f"Memory (MB): {summary}; total pss={total_pss:.1f}", extra={"memory": report})
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._signal)
+        signal.signal(signal.SIGINT, self._signal)
+        for slot in range(self.workers):
+            self.spawn(slot)
+        logger.info(f"Started {self.workers} workers", extra={"master_pid": os.getpid()})
+
+        next_report = time.monotonic() + 10
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                slot = self.children.pop(pid)
+                if not self.stopping:
+                    logger.error(f"Worker {slot} (pid {pid}) exited with status {status}; restarting")
+                    self.spawn(slot)
+                continue
+            if self.report_interval and time.monotonic() >= next_report:
+                self.report_memory()
+                next_report = time.monotonic() + self.report_interval
+            time.sleep(0.5)
+        logger.info("All workers stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Preforked production server.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="0 sizes from cores and memory")
+    parser.add_argument("--worker-memory-mb", type=int, default=WORKER_MEMORY_MB,
+                        help="Expected peak memory per worker, used when sizing automatically")
+    parser.add_argument("--memory-report-interval", type=int, default=MEMORY_REPORT_INTERVAL,
+                        help="Seconds between per-worker memory reports (0 disables)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    workers = args.workers or auto_workers(args.worker_memory_mb)
+    app = preload()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    Master(app, sock, workers, args.log_level, args.memory_report_interval).run()
+
+if __name__ == "__main__":
+    main()
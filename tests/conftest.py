@@ -0,0 +1,7 @@
+import os
+import sys
+
+# app.core.config refuses to import without provider keys; tests never call the providers
+os.environ.setdefault("ANTHROPIC_API_KEY", "test")
+os.environ.setdefault("STABILITY_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,13 @@
+import pytest
+from pydantic import ValidationError
+from app.models.bulk_options import BulkOptions
+
+@pytest.mark.parametrize("value, expected", [(True, True), ("false", False), ("False", False), ("true", True), ("0", False)])
+def test_speculative_image_parses_booleans(value, expected):
+    assert BulkOptions(speculative_image=value).speculative_image is expected
+
+@pytest.mark.parametrize("value", ["maybe", None, [1]])
+def test_speculative_image_rejects_other_values(value):
+    with pytest.raises(ValidationError) as excinfo:
+        BulkOptions(speculative_image=value)
+    assert excinfo.value.errors()[0]["loc"][0] == "speculative_image"
@@ -0,0 +1,31 @@
+import json
+import pytest
+from app.services.text_processing import get_post_facebook, get_posts_linkedIn
+
+@pytest.mark.parametrize("as_raw", [True, False])
+def test_facebook_skips_non_string_text(as_raw):
+    payload = {"data": [
+        {"text": 12345},
+        {"text": "First post"},
+        {"text": {"nested": "object"}},
+        {"text": None},
+        {"text": True},
+        {"text": "Second post"},
+    ]}
+    data = json.dumps(payload) if as_raw else payload
+    assert get_post_facebook(data) == ["First post", "Second post"]
+
+@pytest.mark.parametrize("as_raw", [True, False])
+def test_linkedin_reads_only_post_level_comment(as_raw):
+    payload = {"payload": {"listOfPosts": {"response": {
+        "meta": {"comment": "not a post"},
+        "data": [
+            {"comment": "Post one", "replies": [{"comment": "a reply"}]},
+            {"activity": {"comment": "nested comment"}},
+            {"comment": 42},
+            {"comment": "Post two"},
+        ],
+    }}}}
+    data = json.dumps(payload) if as_raw else payload
+    assert get_posts_linkedIn(data) == ["Post one", "Post two"]
+    assert get_posts_linkedIn(data, limit=1) == ["Post one"]